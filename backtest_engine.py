@@ -5,17 +5,408 @@ Based on Ernest Chan's "Quantitative Trading" Chapter 3
 Backtests the pairs trading strategy with transaction costs.
 """
 
+import os
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from typing import Optional, Tuple
+from typing import List, Optional
+from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import logging
-from utils import (calculate_sharpe_ratio, calculate_max_drawdown, calculate_win_rate,
-                   calculate_profit_factor, print_performance_summary,
-                   plot_equity_curve, plot_drawdown)
+from numba_compat import njit, NUMBA_AVAILABLE, SAFE_FASTMATH
+from utils import (print_performance_summary, plot_equity_curve, plot_drawdown,
+                   get_pyplot)
 
 logger = logging.getLogger(__name__)
 
+# Per-period return columns are stored in float32: daily returns need far less
+# than 7 significant digits and the cumulative/rolling reductions over them
+# are bandwidth-bound. Compounding (cumprod) is done in float64.
+RETURNS_DTYPE = np.float32
+
+# Series longer than this are strided down before plotting
+PLOT_MAX_POINTS = 10_000
+PLOT_TARGET_POINTS = 5_000
+
+# Scalar metrics collected from each backtest in a parameter sweep
+SWEEP_METRICS = ('total_return', 'annualized_return', 'sharpe_ratio', 'max_drawdown', 'drawdown_duration', 'win_rate', 'profit_factor',
+                 'num_trades', 'total_costs', 'final_capital')
+
+
+class BacktestReturns:
+    """
+    Per-period backtest columns held as NumPy arrays.
+    
+    Supports the same column access as the DataFrame it replaces
+    (results['net_returns']); Series and the full DataFrame are only built
+    when first requested, then cached.
+    """
+    
+    COLUMNS = ('gross_returns', 'transaction_costs', 'net_returns',
+               'positions', 'position_changes')
+    
+    def __init__(self, index, **columns: np.ndarray):
+        self.index = index
+        self.arrays = columns
+        self._series = {}
+        self._frame = None
+    
+    def __getitem__(self, column: str) -> pd.Series:
+        series = self._series.get(column)
+        if series is None:
+            series = pd.Series(self.arrays[column], index=self.index, name=column)
+            self._series[column] = series
+        return series
+    
+    def __contains__(self, column: str) -> bool:
+        return column in self.arrays
+    
+    def __len__(self) -> int:
+        return len(self.arrays['net_returns'])
+    
+    @property
+    def frame(self) -> pd.DataFrame:
+        """All columns as a DataFrame (built on first access)."""
+        if self._frame is None:
+            self._frame = pd.DataFrame({c: self.arrays[c] for c in self.COLUMNS},
+                                       index=self.index)
+        return self._frame
+
+
+@dataclass
+class BacktestSpec:
+    """Inputs for a single backtest in a parameter sweep"""
+    prices1: pd.Series
+    prices2: pd.Series
+    positions: pd.Series
+    hedge_ratio: float
+    initial_capital: float = 100000
+    transaction_cost_bps: float = 5.0
+    slippage_bps: float = 2.0
+    label: str = ''
+
+
+@njit(cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _spread_returns_kernel(p1, p2, hedge_ratio):
+    """
+    Position-independent spread returns ret1 - hedge_ratio * ret2.
+    
+    The first period and any NaN/inf returns are set to 0.
+    """
+    n = len(p1)
+    spread = np.zeros(n)
+    
+    for i in range(1, n):
+        r1 = p1[i] / p1[i - 1] - 1.0
+        r2 = p2[i] / p2[i - 1] - 1.0
+        s = r1 - hedge_ratio * r2
+        if np.isfinite(s):
+            spread[i] = s
+    
+    return spread
+
+
+@njit(cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _position_returns_kernel(spread, pos, cost):
+    """
+    Fused single pass applying positions and costs to spread returns.
+    
+    Returns:
+        Tuple of (gross_returns, transaction_costs, net_returns, position_changes)
+    """
+    n = len(spread)
+    gross = np.zeros(n, RETURNS_DTYPE)
+    tx_costs = np.zeros(n, RETURNS_DTYPE)
+    net = np.zeros(n, RETURNS_DTYPE)
+    pos_changes = np.zeros(n)
+    
+    for i in range(1, n):
+        s = pos[i - 1] * spread[i]
+        if not np.isfinite(s):
+            s = 0.0
+        
+        d = pos[i] - pos[i - 1]
+        if not np.isfinite(d):
+            d = 0.0
+        # Comparison-to-float cast compiles to a select, not a branch
+        tc = (d != 0.0) * cost
+        
+        gross[i] = s
+        tx_costs[i] = tc
+        net[i] = s - tc
+        pos_changes[i] = d
+    
+    return gross, tx_costs, net, pos_changes
+
+
+@lru_cache(maxsize=64)
+def specialize_returns_kernel(hedge_ratio: float, cost: float):
+    """
+    Build a returns kernel with hedge ratio and cost fixed.
+    
+    With Numba the two values are closure constants, so LLVM folds them into
+    the compiled loop. Kernels are memoized per (hedge_ratio, cost): a
+    threshold sweep compiles once and reuses the kernel for every variant.
+    Compilation costs a few hundred ms, so this only pays off for sweeps.
+    
+    Args:
+        hedge_ratio: Hedge ratio between symbols
+        cost: Transaction cost per position change, as a fraction of capital
+    
+    Returns:
+        Function (p1, p2, pos) -> (gross_returns, transaction_costs,
+        net_returns, position_changes) taking contiguous float64 arrays
+    """
+    hedge_ratio = float(hedge_ratio)
+    cost = float(cost)
+    
+    if not NUMBA_AVAILABLE:
+        def kernel(p1, p2, pos):
+            return _position_returns_numpy(_spread_returns_numpy(p1, p2, hedge_ratio), pos, cost)
+        return kernel
+    
+    @njit(fastmath=SAFE_FASTMATH, error_model='numpy')
+    def kernel(p1, p2, pos):
+        return _position_returns_kernel(_spread_returns_kernel(p1, p2, hedge_ratio), pos, cost)
+    
+    return kernel
+
+
+def _as_1d_float(x) -> np.ndarray:
+    """Convert a Series, single-column DataFrame or array to a contiguous 1-D float64 array."""
+    values = x.values if hasattr(x, 'values') else x
+    return np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+
+
+def _spread_returns_numpy(p1, p2, hedge_ratio):
+    """Vectorized NumPy equivalent of _spread_returns_kernel, used without Numba."""
+    # Calculate price changes (first period has no prior price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret1 = np.empty_like(p1)
+        ret1[0] = 0.0
+        np.divide(p1[1:], p1[:-1], out=ret1[1:])
+        ret1[1:] -= 1.0
+        
+        ret2 = np.empty_like(p2)
+        ret2[0] = 0.0
+        np.divide(p2[1:], p2[:-1], out=ret2[1:])
+        ret2[1:] -= 1.0
+        
+        ret2 *= hedge_ratio
+        spread = np.subtract(ret1, ret2, out=ret1)
+    
+    # Replace NaN and inf values
+    np.nan_to_num(spread, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    
+    return spread
+
+
+def _position_returns_numpy(spread, pos, cost):
+    """Vectorized NumPy equivalent of _position_returns_kernel, used without Numba."""
+    # Yesterday's position earns today's return
+    gross = np.empty_like(spread)
+    gross[0] = 0.0
+    with np.errstate(invalid='ignore'):
+        np.multiply(pos[:-1], spread[1:], out=gross[1:])
+    np.nan_to_num(gross, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    
+    position_changes = np.empty_like(pos)
+    position_changes[0] = 0.0
+    np.subtract(pos[1:], pos[:-1], out=position_changes[1:])
+    np.nan_to_num(position_changes, copy=False, nan=0.0)
+    
+    transaction_costs = np.where(position_changes != 0, cost, 0.0)
+    net_returns = gross - transaction_costs
+    
+    return (gross.astype(RETURNS_DTYPE), transaction_costs.astype(RETURNS_DTYPE),
+            net_returns.astype(RETURNS_DTYPE), position_changes)
+
+
+@njit(cache=True, fastmath=SAFE_FASTMATH)
+def _stream_metrics_kernel(returns):
+    """
+    Single pass over a return series computing everything run_backtest reports.
+    
+    Returns:
+        Tuple of (cumulative_returns, drawdown, mean, std, wins, gross_profit,
+        gross_loss, max_drawdown, max_drawdown_duration)
+    """
+    n = len(returns)
+    cumulative = np.empty(n)
+    drawdown = np.empty(n)
+    
+    equity = 1.0
+    peak = 1.0
+    max_dd = 0.0
+    duration = 0
+    run = 0
+    mean = 0.0
+    m2 = 0.0
+    wins = 0
+    profit = 0.0
+    loss = 0.0
+    
+    for i in range(n):
+        r = float(returns[i])
+        
+        # Equity curve and drawdown from its high watermark
+        equity *= 1.0 + r
+        if i == 0 or equity > peak:
+            peak = equity
+        dd = equity / peak - 1.0
+        cumulative[i] = equity - 1.0
+        drawdown[i] = dd
+        if dd < max_dd:
+            max_dd = dd
+        if dd < 0.0:
+            run += 1
+            if run > duration:
+                duration = run
+        else:
+            run = 0
+        
+        # Welford running mean/variance for the Sharpe ratio
+        delta = r - mean
+        mean += delta / (i + 1)
+        m2 += delta * (r - mean)
+        
+        # Win rate and profit factor components
+        if r > 0.0:
+            wins += 1
+            profit += r
+        elif r < 0.0:
+            loss -= r
+    
+    std = np.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+    
+    return cumulative, drawdown, mean, std, wins, profit, loss, max_dd, duration
+
+
+def _stream_metrics_numpy(returns):
+    """Vectorized NumPy equivalent of _stream_metrics_kernel, used without Numba."""
+    r = np.asarray(returns, dtype=np.float64)
+    n = len(r)
+    
+    # Equity curve and drawdown from its high watermark
+    equity = np.cumprod(1.0 + r)
+    running_max = np.maximum.accumulate(equity)
+    drawdown = equity / running_max - 1.0
+    
+    # Longest run of consecutive periods spent below the high watermark
+    in_drawdown = drawdown < 0
+    steps = np.arange(n)
+    last_peak = np.maximum.accumulate(np.where(in_drawdown, -1, steps))
+    duration = int(np.max(np.where(in_drawdown, steps - last_peak, 0))) if n else 0
+    
+    mean = r.mean() if n else 0.0
+    std = r.std(ddof=1) if n > 1 else 0.0
+    
+    return (equity - 1.0, drawdown, mean, std, int(np.count_nonzero(r > 0)),
+            r[r > 0].sum(), -r[r < 0].sum(), drawdown.min() if n else 0.0, duration)
+
+
+if NUMBA_AVAILABLE:
+    _spread_returns_core = _spread_returns_kernel
+    _position_returns_core = _position_returns_kernel
+    _stream_metrics_core = _stream_metrics_kernel
+    
+    # Compile (or load from cache) up front so the first backtest of a sweep
+    # doesn't pay the JIT cost
+    _warmup = np.ones(2)
+    _warmup_returns = _position_returns_kernel(_spread_returns_kernel(_warmup, _warmup, 1.0),
+                                               _warmup, 0.0)
+    _stream_metrics_kernel(_warmup_returns[2])
+    _stream_metrics_kernel(_warmup)
+    del _warmup, _warmup_returns
+else:
+    _spread_returns_core = _spread_returns_numpy
+    _position_returns_core = _position_returns_numpy
+    _stream_metrics_core = _stream_metrics_numpy
+
+
+def _stream_metrics(returns: np.ndarray, periods_per_year: int = 252) -> dict:
+    """
+    Compute cumulative returns, drawdown and summary metrics in one pass.
+    
+    Matches utils.calculate_sharpe_ratio / calculate_max_drawdown /
+    calculate_win_rate / calculate_profit_factor.
+    
+    Args:
+        returns: Array of period returns
+        periods_per_year: Number of periods per year (252 for daily)
+    
+    Returns:
+        Dictionary with 'cumulative' and 'drawdown' arrays plus sharpe_ratio,
+        max_drawdown, drawdown_duration, win_rate and profit_factor
+    """
+    (cumulative, drawdown, mean, std, wins, profit, loss,
+     max_dd, duration) = _stream_metrics_core(np.ascontiguousarray(returns))
+    n = len(returns)
+    
+    sharpe = np.sqrt(periods_per_year) * (mean / std) if n > 0 and std > 0 else 0.0
+    
+    if loss == 0:
+        profit_factor = np.inf if profit > 0 else 0.0
+    else:
+        profit_factor = profit / loss
+    
+    return {
+        'cumulative': cumulative,
+        'drawdown': drawdown,
+        'sharpe_ratio': float(sharpe),
+        'max_drawdown': float(max_dd),
+        'drawdown_duration': int(duration),
+        'win_rate': wins / n if n > 0 else 0.0,
+        'profit_factor': float(profit_factor)
+    }
+
+
+def _downsample_for_plot(series: pd.Series) -> pd.Series:
+    """Stride long series down for display; plotting cost grows with point count."""
+    if len(series) > PLOT_MAX_POINTS:
+        return series.iloc[::len(series) // PLOT_TARGET_POINTS]
+    return series
+
+
+def _rolling_sharpe(returns: pd.Series, window: int = 60,
+                    periods_per_year: int = 252) -> pd.Series:
+    """
+    Rolling annualized Sharpe ratio from running sums and sums of squares.
+    
+    Args:
+        returns: Series of period returns
+        window: Rolling window length
+        periods_per_year: Number of periods per year (252 for daily)
+    
+    Returns:
+        Rolling Sharpe ratio series (NaN until the window is filled)
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    rolling = np.full(len(r), np.nan)
+    
+    if len(r) >= window and window > 1:
+        # Centre on the global mean first to avoid cancellation in s2 - s*s/W
+        centre = r.mean()
+        centred = r - centre
+        cs = np.concatenate(([0.0], np.cumsum(centred)))
+        cs2 = np.concatenate(([0.0], np.cumsum(centred * centred)))
+        
+        s = cs[window:] - cs[:-window]
+        s2 = cs2[window:] - cs2[:-window]
+        
+        mean = s / window
+        var = (s2 - s * mean) / (window - 1)
+        # Flat windows leave only accumulated round-off in var; treat them as undefined
+        tol = np.finfo(np.float64).eps * len(r) * cs2[-1] / (window - 1)
+        std = np.sqrt(np.maximum(var, 0.0))
+        std[var <= tol] = np.nan
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rolling[window - 1:] = (mean + centre) / std * np.sqrt(periods_per_year)
+    
+    return pd.Series(rolling, index=returns.index)
+
 
 class BacktestEngine:
     """
@@ -40,10 +431,45 @@ class BacktestEngine:
         self.slippage_bps = slippage_bps
         self.total_cost_bps = transaction_cost_bps + slippage_bps
         
-    def calculate_returns(self, prices1: pd.Series, prices2: pd.Series,
-                         positions: pd.Series, hedge_ratio: float) -> pd.DataFrame:
+        # Spread returns only depend on prices and hedge ratio, so sweeps over
+        # thresholds/positions on the same pair reuse them (LRU, most recent last)
+        self._spread_cache = OrderedDict()
+        self._spread_cache_size = 32
+        
+    def _get_spread_returns(self, p1: np.ndarray, p2: np.ndarray,
+                            hedge_ratio: float) -> np.ndarray:
         """
-        Calculate returns from positions.
+        Return cached spread returns for a price pair and hedge ratio.
+        
+        Keyed on the price buffers' addresses; the cache keeps a reference to
+        the arrays so an address cannot be reused by different data while cached.
+        Price arrays are assumed not to be modified in place between calls.
+        """
+        key = (p1.ctypes.data, p2.ctypes.data, len(p1), hedge_ratio)
+        cached = self._spread_cache.get(key)
+        if cached is not None:
+            self._spread_cache.move_to_end(key)
+            return cached[2]
+        
+        spread = _spread_returns_core(p1, p2, hedge_ratio)
+        self._spread_cache[key] = (p1, p2, spread)
+        if len(self._spread_cache) > self._spread_cache_size:
+            self._spread_cache.popitem(last=False)
+        
+        return spread
+        
+    def specialize(self, hedge_ratio: float):
+        """
+        Returns kernel specialized to this engine's costs and a fixed hedge ratio.
+        
+        See specialize_returns_kernel; use for hot threshold sweeps on one pair.
+        """
+        return specialize_returns_kernel(float(hedge_ratio), self.total_cost_bps / 10000)
+    
+    def calculate_metrics_fast(self, prices1: pd.Series, prices2: pd.Series,
+                               positions: pd.Series, hedge_ratio: float) -> dict:
+        """
+        Calculate per-period returns and trade statistics without building a DataFrame.
         
         From Chan: Returns are calculated on the spread, which is a portfolio
         of long symbol1 and short symbol2.
@@ -55,54 +481,69 @@ class BacktestEngine:
             hedge_ratio: Hedge ratio between symbols
         
         Returns:
-            DataFrame with returns and other metrics
+            Dictionary with 'returns' (BacktestReturns), 'num_trades' and
+            'total_cost_rate' (summed costs as a fraction of capital)
         """
-        # Ensure data is properly aligned
-        prices1 = prices1.squeeze() if isinstance(prices1, pd.DataFrame) else prices1
-        prices2 = prices2.squeeze() if isinstance(prices2, pd.DataFrame) else prices2
-        
-        # Calculate price changes
-        ret1 = prices1.pct_change()
-        ret2 = prices2.pct_change()
+        # Work on raw arrays: each pandas step (squeeze, pct_change, shift,
+        # fillna, diff) would otherwise allocate a new Series
+        index = getattr(prices1, 'index', None)
+        p1 = _as_1d_float(prices1)
+        p2 = _as_1d_float(prices2)
+        pos = _as_1d_float(positions)
         
-        # Calculate spread returns
+        # Spread returns:
         # When long spread (positions=+1): long symbol1, short symbol2
         # Spread return = ret1 - hedge_ratio * ret2
         #
         # When short spread (positions=-1): short symbol1, long symbol2
         # Spread return = -(ret1 - hedge_ratio * ret2)
+        #
+        # Yesterday's position earns today's return; NaN/inf returns count as 0.
+        # Transaction costs occur when the position changes, on both legs,
+        # as a percentage of capital.
+        cost = self.total_cost_bps / 10000
+        spread = self._get_spread_returns(p1, p2, float(hedge_ratio))
+        spread_returns, transaction_costs, net_returns, position_changes = \
+            _position_returns_core(spread, pos, cost)
         
-        spread_returns = positions.shift(1) * (ret1 - hedge_ratio * ret2)
-        
-        # Replace NaN and inf values
-        spread_returns = spread_returns.replace([np.inf, -np.inf], 0).fillna(0)
-        
-        # Calculate transaction costs
-        # Costs occur when position changes
-        position_changes = positions.diff().fillna(0)
-        has_transaction = (position_changes != 0).astype(float)
+        returns = BacktestReturns(
+            index,
+            gross_returns=spread_returns,
+            transaction_costs=transaction_costs,
+            net_returns=net_returns,
+            positions=pos,
+            position_changes=position_changes
+        )
         
-        # Transaction cost as percentage of capital
-        # We trade both symbols, so cost is incurred on both legs
-        transaction_costs = has_transaction * (self.total_cost_bps / 10000)
+        # Every trade costs the same, so total cost follows from the trade count
+        num_trades = int(np.count_nonzero(position_changes))
         
-        # Net returns after costs
-        net_returns = spread_returns - transaction_costs
+        return {
+            'returns': returns,
+            'num_trades': num_trades,
+            'total_cost_rate': num_trades * cost
+        }
+    
+    def calculate_returns(self, prices1: pd.Series, prices2: pd.Series,
+                         positions: pd.Series, hedge_ratio: float) -> pd.DataFrame:
+        """
+        Calculate returns from positions.
         
-        # Create results dataframe  
-        results = pd.DataFrame({
-            'gross_returns': spread_returns,
-            'transaction_costs': transaction_costs,
-            'net_returns': net_returns,
-            'positions': positions,
-            'position_changes': position_changes
-        }, index=prices1.index)
+        Args:
+            prices1: Price series for symbol 1
+            prices2: Price series for symbol 2
+            positions: Position series (+1 long spread, -1 short spread, 0 flat)
+            hedge_ratio: Hedge ratio between symbols
         
-        return results
+        Returns:
+            DataFrame with returns and other metrics
+        """
+        return self.calculate_metrics_fast(prices1, prices2, positions, hedge_ratio)['returns'].frame
     
     def run_backtest(self, prices1: pd.Series, prices2: pd.Series,
                     positions: pd.Series, hedge_ratio: float,
-                    initial_capital: float = 100000) -> dict:
+                    initial_capital: float = 100000,
+                    include_gross: bool = True) -> dict:
         """
         Run complete backtest and calculate performance metrics.
         
@@ -112,80 +553,100 @@ class BacktestEngine:
             positions: Position series
             hedge_ratio: Hedge ratio
             initial_capital: Starting capital (default: $100,000)
+            include_gross: Also compute before-cost metrics (cumulative_gross,
+                sharpe_gross). Sweeps that only rank on net metrics can pass
+                False to skip the second pass; plot_results then draws the
+                net curve only (default: True)
         
         Returns:
             Dictionary with backtest results and metrics
         """
-        logger.info("="*60)
-        logger.info("RUNNING BACKTEST")
-        logger.info("="*60)
-        logger.info(f"Initial Capital: ${initial_capital:,.2f}")
-        logger.info(f"Transaction Cost: {self.transaction_cost_bps} bps")
-        logger.info(f"Slippage: {self.slippage_bps} bps")
-        logger.info(f"Total Cost: {self.total_cost_bps} bps")
-        logger.info(f"Period: {prices1.index[0]} to {prices1.index[-1]}")
-        logger.info(f"Number of days: {len(prices1)}")
+        # Skip formatting entirely when INFO is off (e.g. in sweep workers)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("="*60)
+            logger.info("RUNNING BACKTEST")
+            logger.info("="*60)
+            logger.info(f"Initial Capital: ${initial_capital:,.2f}")
+            logger.info(f"Transaction Cost: {self.transaction_cost_bps} bps")
+            logger.info(f"Slippage: {self.slippage_bps} bps")
+            logger.info(f"Total Cost: {self.total_cost_bps} bps")
+            logger.info(f"Period: {prices1.index[0]} to {prices1.index[-1]}")
+            logger.info(f"Number of days: {len(prices1)}")
         
         # Calculate returns
-        results = self.calculate_returns(prices1, prices2, positions, hedge_ratio)
+        fast = self.calculate_metrics_fast(prices1, prices2, positions, hedge_ratio)
+        results = fast['returns']
+        
+        # Cumulative returns, drawdown and summary metrics in one pass per series
+        # (compounded in float64 to avoid drift on long series)
+        net_metrics = _stream_metrics(results.arrays['net_returns'])
+        net_cum = net_metrics['cumulative']
         
-        # Calculate cumulative returns
-        cumulative_returns = (1 + results['net_returns']).cumprod() - 1
-        cumulative_gross =  (1 + results['gross_returns']).cumprod() - 1
+        cumulative_returns = pd.Series(net_cum, index=results.index)
+        drawdown = pd.Series(net_metrics['drawdown'], index=results.index)
         
         # Calculate equity curve
-        equity = initial_capital * (1 + cumulative_returns)
+        equity_arr = initial_capital * (1.0 + net_cum)
+        equity = pd.Series(equity_arr, index=results.index)
         
         # Performance metrics
-        sharpe = calculate_sharpe_ratio(results['net_returns'], periods_per_year=252)
-        sharpe_gross = calculate_sharpe_ratio(results['gross_returns'], periods_per_year=252)
+        sharpe = net_metrics['sharpe_ratio']
         
-        max_dd, dd_duration = calculate_max_drawdown(cumulative_returns)
+        max_dd = net_metrics['max_drawdown']
+        dd_duration = net_metrics['drawdown_duration']
         
-        win_rate = calculate_win_rate(results['net_returns'])
-        profit_factor = calculate_profit_factor(results['net_returns'])
+        win_rate = net_metrics['win_rate']
+        profit_factor = net_metrics['profit_factor']
         
         # Count trades
-        num_trades = (results['position_changes'] != 0).sum()
-        total_costs = results['transaction_costs'].sum() * initial_capital
+        num_trades = fast['num_trades']
+        total_costs = fast['total_cost_rate'] * initial_capital
         
         # Calculate returns
-        total_return = cumulative_returns.iloc[-1]
-        total_gross_return = cumulative_gross.iloc[-1]
+        total_return = float(net_cum[-1])
+        final_equity = float(equity_arr[-1])
         
         # Annualized returns
         years = len(prices1) / 252
         if years > 0:
             annualized_return = (1 + total_return) ** (1 / years) - 1
-            annualized_gross = (1 + total_gross_return) ** (1 / years) - 1
         else:
             annualized_return = 0
-            annualized_gross = 0
-        
-        logger.info("\n" + "="*60)
-        logger.info("BACKTEST RESULTS")
-        logger.info("="*60)
-        logger.info(f"Total Return (Net):      {total_return*100:>10.2f}%")
-        logger.info(f"Total Return (Gross):    {total_gross_return*100:>10.2f}%")
-        logger.info(f"Annualized Return:       {annualized_return*100:>10.2f}%")
-        logger.info(f"Sharpe Ratio (Net):      {sharpe:>10.2f}")
-        logger.info(f"Sharpe Ratio (Gross):    {sharpe_gross:>10.2f}")
-        logger.info(f"Max Drawdown:            {max_dd*100:>10.2f}%")
-        logger.info(f"Drawdown Duration:       {dd_duration:>10d} days")
-        logger.info(f"Win Rate:                {win_rate*100:>10.2f}%")
-        logger.info(f"Profit Factor:           {profit_factor:>10.2f}")
-        logger.info(f"Number of Trades:        {num_trades:>10d}")
-        logger.info(f"Total Transaction Costs: ${total_costs:>10,.2f}")
-        logger.info(f"Final Equity:            ${equity.iloc[-1]:>10,.2f}")
-        logger.info("="*60)
         
-        return {
+        # Before-cost metrics
+        if include_gross:
+            gross_metrics = _stream_metrics(results.arrays['gross_returns'])
+            gross_cum = gross_metrics['cumulative']
+            cumulative_gross = pd.Series(gross_cum, index=results.index)
+            sharpe_gross = gross_metrics['sharpe_ratio']
+            total_gross_return = float(gross_cum[-1])
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n" + "="*60)
+            logger.info("BACKTEST RESULTS")
+            logger.info("="*60)
+            logger.info(f"Total Return (Net):      {total_return*100:>10.2f}%")
+            if include_gross:
+                logger.info(f"Total Return (Gross):    {total_gross_return*100:>10.2f}%")
+            logger.info(f"Annualized Return:       {annualized_return*100:>10.2f}%")
+            logger.info(f"Sharpe Ratio (Net):      {sharpe:>10.2f}")
+            if include_gross:
+                logger.info(f"Sharpe Ratio (Gross):    {sharpe_gross:>10.2f}")
+            logger.info(f"Max Drawdown:            {max_dd*100:>10.2f}%")
+            logger.info(f"Drawdown Duration:       {dd_duration:>10d} days")
+            logger.info(f"Win Rate:                {win_rate*100:>10.2f}%")
+            logger.info(f"Profit Factor:           {profit_factor:>10.2f}")
+            logger.info(f"Number of Trades:        {num_trades:>10d}")
+            logger.info(f"Total Transaction Costs: ${total_costs:>10,.2f}")
+            logger.info(f"Final Equity:            ${final_equity:>10,.2f}")
+            logger.info("="*60)
+        
+        backtest_results = {
             'results': results,
             'cumulative_returns': cumulative_returns,
-            'cumulative_gross': cumulative_gross,
             'equity': equity,
+            'drawdown_series': drawdown,
             'sharpe_ratio': sharpe,
-            'sharpe_gross': sharpe_gross,
             'max_drawdown': max_dd,
             'drawdown_duration': dd_duration,
             'win_rate': win_rate,
@@ -195,8 +656,49 @@ class BacktestEngine:
             'annualized_return': annualized_return,
             'total_costs': total_costs,
             'initial_capital': initial_capital,
-            'final_capital': equity.iloc[-1]
+            'final_capital': final_equity
         }
+        if include_gross:
+            backtest_results['cumulative_gross'] = cumulative_gross
+            backtest_results['sharpe_gross'] = sharpe_gross
+        
+        return backtest_results
+    
+    def run_portfolio_backtest(self, prices1_mat, prices2_mat, positions_mat,
+                               hedge_ratios, pair_names: Optional[List[str]] = None,
+                               backend: str = 'numpy') -> pd.DataFrame:
+        """
+        Backtest many pairs in one vectorized call.
+        
+        Pairs are stacked row-wise into (num_pairs, T) arrays so the return,
+        cost and metric arithmetic runs once over the whole block instead of
+        once per pair through run_backtest.
+        
+        Args:
+            prices1_mat: Prices for each pair's symbol 1, shape (num_pairs, T)
+            prices2_mat: Prices for each pair's symbol 2, shape (num_pairs, T)
+            positions_mat: Positions per pair, shape (num_pairs, T)
+            hedge_ratios: Hedge ratio per pair, shape (num_pairs,)
+            pair_names: Optional row labels (e.g. 'GLD-GDX')
+            backend: 'numpy' (CPU) or 'cupy' (GPU), see batch_backtest_metrics
+        
+        Returns:
+            DataFrame with one row of metrics per pair
+        """
+        metrics = batch_backtest_metrics(
+            np.asarray(prices1_mat, dtype=np.float64),
+            np.asarray(prices2_mat, dtype=np.float64),
+            np.asarray(positions_mat, dtype=np.float64),
+            np.asarray(hedge_ratios, dtype=np.float64),
+            cost=self.total_cost_bps / 10000,
+            backend=backend
+        )
+        
+        summary = pd.DataFrame(metrics, index=pair_names)
+        logger.info(f"Portfolio backtest: {len(summary)} pairs, "
+                    f"mean Sharpe {summary['sharpe_ratio'].mean():.2f}")
+        
+        return summary
     
     def plot_results(self, backtest_results: dict, title: str = "Backtest Results"):
         """
@@ -206,12 +708,14 @@ class BacktestEngine:
             backtest_results: Dictionary from run_backtest()
             title: Plot title
         """
+        plt = get_pyplot()
+        
         fig = plt.figure(figsize=(16, 12))
         gs = fig.add_gridspec(3, 2, hspace=0.3, wspace=0.3)
         
         # Plot 1: Equity curve
         ax1 = fig.add_subplot(gs[0, :])
-        equity = backtest_results['equity']
+        equity = _downsample_for_plot(backtest_results['equity'])
         ax1.plot(equity.index, equity.values, linewidth=2, color='blue')
         ax1.axhline(y=backtest_results['initial_capital'], color='red', 
                    linestyle='--', label='Initial Capital', alpha=0.7)
@@ -221,14 +725,16 @@ class BacktestEngine:
         ax1.grid(True, alpha=0.3)
         ax1.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
         
-        # Plot 2: Cumulative returns (net vs gross)
+        # Plot 2: Cumulative returns (net vs gross; gross is absent when
+        # run_backtest was called with include_gross=False)
         ax2 = fig.add_subplot(gs[1, 0])
-        cum_net = backtest_results['cumulative_returns'] * 100
-        cum_gross = backtest_results['cumulative_gross'] * 100
+        cum_net = _downsample_for_plot(backtest_results['cumulative_returns']) * 100
         ax2.plot(cum_net.index, cum_net.values, linewidth=2, 
                 label='Net Returns', color='green')
-        ax2.plot(cum_gross.index, cum_gross.values, linewidth=2, 
-                label='Gross Returns', color='blue', alpha=0.6)
+        if 'cumulative_gross' in backtest_results:
+            cum_gross = _downsample_for_plot(backtest_results['cumulative_gross']) * 100
+            ax2.plot(cum_gross.index, cum_gross.values, linewidth=2, 
+                    label='Gross Returns', color='blue', alpha=0.6)
         ax2.set_title('Cumulative Returns', fontsize=12, fontweight='bold')
         ax2.set_ylabel('Return (%)', fontsize=11)
         ax2.legend()
@@ -236,9 +742,7 @@ class BacktestEngine:
         
         # Plot 3: Drawdown
         ax3 = fig.add_subplot(gs[1, 1])
-        cum_ret = backtest_results['cumulative_returns']
-        running_max = cum_ret.cummax()
-        drawdown = ((cum_ret - running_max) / (1 + running_max)) * 100
+        drawdown = _downsample_for_plot(backtest_results['drawdown_series']) * 100
         ax3.fill_between(drawdown.index, drawdown.values, 0, 
                         color='red', alpha=0.3)
         ax3.plot(drawdown.index, drawdown.values, color='darkred', linewidth=2)
@@ -248,7 +752,7 @@ class BacktestEngine:
         
         # Plot 4: Positions over time
         ax4 = fig.add_subplot(gs[2, 0])
-        positions = backtest_results['results']['positions']
+        positions = _downsample_for_plot(backtest_results['results']['positions'])
         ax4.plot(positions.index, positions.values, linewidth=1.5, 
                 color='purple', drawstyle='steps-post')
         ax4.set_title('Positions Over Time', fontsize=12, fontweight='bold')
@@ -261,7 +765,8 @@ class BacktestEngine:
         # Plot 5: Rolling Sharpe ratio (60-day)
         ax5 = fig.add_subplot(gs[2, 1])
         returns = backtest_results['results']['net_returns']
-        rolling_sharpe = returns.rolling(60).mean() / returns.rolling(60).std() * np.sqrt(252)
+        rolling_sharpe = _downsample_for_plot(
+            _rolling_sharpe(returns, window=60, periods_per_year=252))
         ax5.plot(rolling_sharpe.index, rolling_sharpe.values, linewidth=2, color='orange')
         ax5.axhline(y=0, color='black', linestyle='-', alpha=0.3)
         ax5.axhline(y=1, color='green', linestyle='--', alpha=0.5, label='Sharpe=1')
@@ -300,18 +805,29 @@ class BacktestEngine:
             ('Profit Factor', 'profit_factor', 1),
             ('Num Trades', 'num_trades', 1)
         ]
+        percent_keys = {'total_return', 'annualized_return', 'max_drawdown', 'win_rate'}
         
-        for name, key, multiplier in metrics:
-            train_val = train_results[key] * multiplier if key != 'num_trades' else train_results[key]
-            test_val = test_results[key] * multiplier if key != 'num_trades' else test_results[key]
-            
-            if train_val != 0 and key != 'num_trades':
-                change = ((test_val - train_val) / abs(train_val)) * 100
-                change_str = f"{change:+.1f}%"
-            else:
-                change_str = "-"
+        train_vals = np.fromiter((train_results[key] for _, key, _ in metrics),
+                                 dtype=np.float64, count=len(metrics))
+        test_vals = np.fromiter((test_results[key] for _, key, _ in metrics),
+                                dtype=np.float64, count=len(metrics))
+        multipliers = np.array([m for _, _, m in metrics], dtype=np.float64)
+        
+        train_scaled = train_vals * multipliers
+        test_scaled = test_vals * multipliers
+        
+        # Relative change is not meaningful for trade counts
+        has_change = (train_vals != 0) & np.array([key != 'num_trades' for _, key, _ in metrics])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(has_change,
+                              (test_scaled - train_scaled) / np.abs(train_scaled) * 100.0,
+                              np.nan)
+        
+        for (name, key, _), train_val, test_val, chg in zip(metrics, train_scaled,
+                                                            test_scaled, change):
+            change_str = f"{chg:+.1f}%" if not np.isnan(chg) else "-"
             
-            if key in ['total_return', 'annualized_return', 'max_drawdown', 'win_rate']:
+            if key in percent_keys:
                 print(f"{name:<25} {train_val:>14.2f}% {test_val:>14.2f}% {change_str:>10}")
             elif key == 'num_trades':
                 print(f"{name:<25} {train_val:>15.0f} {test_val:>15.0f} {change_str:>10}")
@@ -333,6 +849,142 @@ class BacktestEngine:
             logger.info("⚠ Strategy shows marginal out-of-sample performance.")
 
 
+def _array_module(backend: str):
+    """Return the array module for a batch backend ('numpy' or 'cupy')."""
+    if backend == 'numpy':
+        return np
+    if backend == 'cupy':
+        try:
+            import cupy
+        except ImportError as e:
+            raise ImportError("backend='cupy' requires CuPy "
+                              "(e.g. pip install cupy-cuda12x)") from e
+        return cupy
+    raise ValueError(f"Unknown backend: {backend} (expected 'numpy' or 'cupy')")
+
+
+def batch_backtest_metrics(prices1, prices2, positions, hedge_ratios, cost: float,
+                           backend: str = 'numpy', periods_per_year: int = 252) -> dict:
+    """
+    Backtest many pairs at once on (num_pairs, T) arrays.
+    
+    Same return and cost model as BacktestEngine.calculate_returns, expressed
+    as whole-matrix operations so it can run on the GPU with backend='cupy'.
+    The GPU only pays off for large sweeps (num_pairs * T above ~1e7); below
+    that, transfer and launch overhead dominate.
+    
+    Args:
+        prices1: Prices for symbol 1, shape (num_pairs, T)
+        prices2: Prices for symbol 2, shape (num_pairs, T)
+        positions: Positions, shape (num_pairs, T)
+        hedge_ratios: Hedge ratio per pair, shape (num_pairs,)
+        cost: Transaction cost per position change, as a fraction of capital
+        backend: 'numpy' (CPU) or 'cupy' (GPU)
+        periods_per_year: Number of periods per year (252 for daily)
+    
+    Returns:
+        Dictionary of per-pair NumPy arrays: total_return, annualized_return,
+        sharpe_ratio, max_drawdown, win_rate, num_trades
+    """
+    xp = _array_module(backend)
+    
+    p1 = xp.asarray(prices1, dtype=xp.float64)
+    p2 = xp.asarray(prices2, dtype=xp.float64)
+    pos = xp.asarray(positions, dtype=xp.float64)
+    hedge = xp.asarray(hedge_ratios, dtype=xp.float64).reshape(-1, 1)
+    num_periods = p1.shape[1]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Spread returns, with the first period and non-finite values zeroed
+        spread = xp.zeros_like(p1)
+        spread[:, 1:] = (p1[:, 1:] / p1[:, :-1] - 1.0) - hedge * (p2[:, 1:] / p2[:, :-1] - 1.0)
+        spread = xp.where(xp.isfinite(spread), spread, 0.0)
+        
+        # Yesterday's position earns today's return
+        gross = xp.zeros_like(spread)
+        gross[:, 1:] = pos[:, :-1] * spread[:, 1:]
+        gross = xp.where(xp.isfinite(gross), gross, 0.0)
+        
+        position_changes = xp.zeros_like(pos)
+        position_changes[:, 1:] = pos[:, 1:] - pos[:, :-1]
+        position_changes = xp.where(xp.isfinite(position_changes), position_changes, 0.0)
+        
+        net = gross - xp.where(position_changes != 0, cost, 0.0)
+        
+        equity = xp.cumprod(1.0 + net, axis=1)
+        running_max = xp.maximum.accumulate(equity, axis=1)
+        max_drawdown = (equity / running_max - 1.0).min(axis=1)
+        
+        total_return = equity[:, -1] - 1.0
+        annualized_return = (1.0 + total_return) ** (periods_per_year / num_periods) - 1.0
+        
+        std = net.std(axis=1, ddof=1)
+        sharpe = xp.where(std > 0, np.sqrt(periods_per_year) * net.mean(axis=1) / std, 0.0)
+    
+    metrics = {
+        'total_return': total_return,
+        'annualized_return': annualized_return,
+        'sharpe_ratio': sharpe,
+        'max_drawdown': max_drawdown,
+        'win_rate': (net > 0).mean(axis=1),
+        'num_trades': xp.count_nonzero(position_changes, axis=1)
+    }
+    
+    # Hand results back as host (NumPy) arrays
+    return {key: value.get() if hasattr(value, 'get') else value
+            for key, value in metrics.items()}
+
+
+def _init_sweep_worker(log_level: int):
+    """Quiet per-backtest logging inside sweep worker processes."""
+    logging.getLogger().setLevel(log_level)
+    logger.setLevel(log_level)
+
+
+def _run_spec(spec: BacktestSpec) -> dict:
+    """Run one sweep backtest and keep only its scalar metrics."""
+    engine = BacktestEngine(transaction_cost_bps=spec.transaction_cost_bps,
+                            slippage_bps=spec.slippage_bps)
+    results = engine.run_backtest(spec.prices1, spec.prices2, spec.positions,
+                                  spec.hedge_ratio, spec.initial_capital,
+                                  include_gross=False)
+    return {key: results[key] for key in SWEEP_METRICS}
+
+
+def run_many(specs: List[BacktestSpec], max_workers: Optional[int] = None,
+             log_level: int = logging.WARNING) -> pd.DataFrame:
+    """
+    Run independent backtests in parallel across processes.
+    
+    Each spec (pair, threshold set, cost level, ...) is backtested on its own,
+    so a sweep scales with the number of cores.
+    
+    Args:
+        specs: Backtest inputs, one per strategy variant
+        max_workers: Number of worker processes (default: os.cpu_count())
+        log_level: Logging level inside workers (default: WARNING)
+    
+    Returns:
+        DataFrame with one row of metrics per spec, in input order
+    """
+    if not specs:
+        return pd.DataFrame(columns=['label', *SWEEP_METRICS])
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    logger.info(f"Running {len(specs)} backtests on {max_workers} worker(s)")
+    
+    rows = [None] * len(specs)
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_sweep_worker,
+                             initargs=(log_level,)) as executor:
+        futures = {executor.submit(_run_spec, spec): i for i, spec in enumerate(specs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            rows[i] = {'label': specs[i].label, **future.result()}
+    
+    return pd.DataFrame(rows)
+
+
 if __name__ == "__main__":
     # Test the backtesting engine
     from data_fetcher import DataFetcher
@@ -355,17 +1007,17 @@ if __name__ == "__main__":
     # Run strategy
     strategy = PairsTradingStrategy(entry_threshold=2.0, exit_threshold=1.0)
     strategy_results = strategy.run_strategy(
-        prices1=test1['close'],
-        prices2=test2['close'],
-        train_prices1=train1['close'],
-        train_prices2=train2['close']
+        prices1=test1,
+        prices2=test2,
+        train_prices1=train1,
+        train_prices2=train2
     )
     
     # Backtest
     backtest = BacktestEngine(transaction_cost_bps=5, slippage_bps=2)
     results = backtest.run_backtest(
-        prices1=test1['close'],
-        prices2=test2['close'],
+        prices1=test1,
+        prices2=test2,
         positions=strategy_results['positions'],
         hedge_ratio=strategy_results['hedge_ratio'],
         initial_capital=100000
@@ -373,6 +1025,6 @@ if __name__ == "__main__":
     
     # Plot
     fig = backtest.plot_results(results, title="GLD-GDX Pairs Trading Backtest")
-    plt.savefig('backtest_results.png', dpi=150, bbox_inches='tight')
+    fig.savefig('backtest_results.png', dpi=150, bbox_inches='tight')
     print(f"\nPlot saved as 'backtest_results.png'")
-    plt.show()
+    get_pyplot().show()
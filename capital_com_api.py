@@ -12,11 +12,47 @@ Created: December 2025
 import os
 import logging
 import time
-from typing import Dict, List, Optional, Any, Tuple
+import random
+import asyncio
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Callable, Iterable
 from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
 from dotenv import load_dotenv
-from functools import wraps
+from functools import wraps, lru_cache
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# orjson parses/serializes straight from/to bytes and is several times faster
+# than the stdlib on large price payloads; fall back to json when missing
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 # Load environment variables
 load_dotenv()
@@ -28,12 +64,252 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Sessions expire after 10 minutes of inactivity; reuse cached tokens only
+# while comfortably inside that window
+SESSION_CACHE_TTL = 540
+
+# Keep-alive interval for the background session refresh. Well inside the
+# 10-minute session inactivity timeout, and short enough that idle pooled
+# connections aren't reaped by the server/load balancer (commonly ~5 min)
+# between trading cycles, so the next order reuses a warm TLS connection
+SESSION_REFRESH_INTERVAL = 240
+
+# TCP keep-alive probes on pooled connections, so the NAT/load balancer
+# does not silently drop them between trading cycles and the next order
+# pays a fresh TCP + TLS handshake. Options the platform lacks are skipped
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name)
+]
+
+# Network/server errors that are worth retrying
+TRANSIENT_STATUS_CODES = frozenset({
+    408,  # Request Timeout
+    429,  # Too Many Requests
+    500,  # Internal Server Error
+    502,  # Bad Gateway
+    503,  # Service Unavailable
+    504,  # Gateway Timeout
+})
+
+# Bar length per price resolution, used to expire cached price history at
+# the next bar boundary (WEEK is left out: its boundaries aren't epoch-aligned)
+RESOLUTION_SECONDS = {
+    'MINUTE': 60,
+    'MINUTE_5': 300,
+    'MINUTE_15': 900,
+    'MINUTE_30': 1800,
+    'HOUR': 3600,
+    'HOUR_4': 14400,
+    'DAY': 86400,
+}
+
+# Order directions accepted by the positions endpoint
+VALID_DIRECTIONS = frozenset({'BUY', 'SELL'})
+
+# A successful health check is trusted for this long before probing again
+HEALTH_CHECK_TTL = 5.0
+
+# Market snapshots (bid/offer) younger than this are served from memory;
+# back-to-back signals on the same instrument skip a round trip
+MARKET_DETAILS_TTL = 1.0
+
 
 class CapitalComAPIError(Exception):
     """Custom exception for Capital.com API errors"""
     pass
 
 
+# Endpoint paths for the instruments/positions a bot polls repeatedly
+@lru_cache(maxsize=256)
+def _price_endpoint(epic: str) -> str:
+    return f'/api/v1/prices/{epic}'
+
+
+@lru_cache(maxsize=256)
+def _market_endpoint(epic: str) -> str:
+    return f'/api/v1/markets/{epic}'
+
+
+@lru_cache(maxsize=256)
+def _position_endpoint(deal_id: str) -> str:
+    return f'/api/v1/positions/{deal_id}'
+
+
+def _stream_prices_to_frame(stream, capacity: int) -> pd.DataFrame:
+    """
+    Incrementally parse a prices response body into a price DataFrame.
+    
+    Bars are decoded one at a time straight into preallocated arrays, so the
+    full dict tree of the response is never held in memory.
+    
+    Args:
+        stream: File-like response body
+        capacity: Maximum number of bars expected
+    
+    Returns:
+        DataFrame in the same layout as prices_to_frame()
+    """
+    columns = {name: np.empty(capacity, dtype=np.float64)
+               for name in ('open', 'high', 'low', 'close', 'volume')}
+    fields = (('open', 'openPrice'), ('high', 'highPrice'),
+              ('low', 'lowPrice'), ('close', 'closePrice'))
+    times = []
+    
+    n = 0
+    for bar in ijson.items(stream, 'prices.item', use_float=True):
+        if n == capacity:
+            break
+        times.append(bar.get('snapshotTime', '')[:19])
+        for name, field in fields:
+            columns[name][n] = bar.get(field, {}).get('bid', np.nan)
+        columns['volume'][n] = bar.get('lastTradedVolume', 0)
+        n += 1
+    
+    index = pd.to_datetime(times)
+    index.name = 'time'
+    
+    return pd.DataFrame({name: values[:n] for name, values in columns.items()}, index=index)
+
+
+def _position_request(epic: str, direction: str, size: float,
+                      stop_loss: Optional[float], take_profit: Optional[float],
+                      guaranteed_stop: bool) -> Dict:
+    """Validate an order and build its POST /positions body"""
+    # Validate direction
+    direction = direction.upper()
+    if direction not in VALID_DIRECTIONS:
+        raise ValueError("direction must be 'BUY' or 'SELL'")
+    
+    # Build position request
+    position_data = {
+        'epic': epic,
+        'direction': direction,
+        'size': size,
+        'guaranteedStop': guaranteed_stop
+    }
+    
+    # Add stop loss if provided
+    if stop_loss:
+        position_data['stopLevel'] = stop_loss
+    
+    # Add take profit if provided
+    if take_profit:
+        position_data['profitLevel'] = take_profit
+    
+    return position_data
+
+
+def _update_request(stop_loss: Optional[float], take_profit: Optional[float]) -> Dict:
+    """Build the PUT /positions/{dealId} body for new stop/limit levels"""
+    update_data = {}
+    if stop_loss is not None:
+        update_data['stopLevel'] = stop_loss
+    if take_profit is not None:
+        update_data['profitLevel'] = take_profit
+    
+    if not update_data:
+        raise ValueError("Must provide at least stop_loss or take_profit")
+    
+    return update_data
+
+
+def _balance_info(accounts: List[Dict]) -> Dict:
+    """Summarize the current (first) account of a GET /accounts response"""
+    if not accounts:
+        raise CapitalComAPIError("No accounts found")
+    
+    account = accounts[0]
+    balance = account.get('balance', {})
+    
+    balance_info = {
+        'account_id': account.get('accountId'),
+        'account_name': account.get('accountName'),
+        'balance': balance.get('balance', 0),
+        'deposit': balance.get('deposit', 0),
+        'profit_loss': balance.get('profitLoss', 0),
+        'available': balance.get('available', 0),
+        'currency': account.get('currency', 'USD')
+    }
+    
+    logger.info(f"Balance: {balance_info['balance']} {balance_info['currency']}")
+    logger.info(f"Available: {balance_info['available']} {balance_info['currency']}")
+    
+    return balance_info
+
+
+def _split_outcomes(labels: List[str], outcomes: List) -> Tuple[List, List[str]]:
+    """
+    Separate the results of a batch of calls from their exceptions.
+    
+    Args:
+        labels: Name of each call, used in the error strings
+        outcomes: Result or raised exception of each call, in order
+    
+    Returns:
+        (results, errors) where errors are "label: exception" strings
+    """
+    results = []
+    errors = []
+    for label, outcome in zip(labels, outcomes):
+        if isinstance(outcome, Exception):
+            errors.append(f"{label}: {outcome}")
+        else:
+            results.append(outcome)
+    return results, errors
+
+
+def _future_outcome(future):
+    """Result of a finished future, or the exception it raised"""
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def prices_to_frame(prices: List[Dict]) -> pd.DataFrame:
+    """
+    Convert Capital.com price bars into a column-oriented DataFrame.
+    
+    Each field is pulled out in a single pass into its own NumPy array, so
+    indicators downstream run vectorized instead of walking nested dicts.
+    
+    Args:
+        prices: Price bars as returned by get_historical_prices()
+    
+    Returns:
+        DataFrame indexed by bar time with bid open/high/low/close and volume
+    """
+    n = len(prices)
+    
+    def bid_column(field):
+        return np.fromiter((bar.get(field, {}).get('bid', np.nan) for bar in prices),
+                           dtype=np.float64, count=n)
+    
+    index = pd.to_datetime([bar.get('snapshotTime', '')[:19] for bar in prices])
+    index.name = 'time'
+    
+    return pd.DataFrame({
+        'open': bid_column('openPrice'),
+        'high': bid_column('highPrice'),
+        'low': bid_column('lowPrice'),
+        'close': bid_column('closePrice'),
+        'volume': np.fromiter((bar.get('lastTradedVolume', 0) for bar in prices),
+                              dtype=np.float64, count=n)
+    }, index=index)
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections carry KEEPALIVE_SOCKET_OPTIONS"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
 class CapitalComAPI:
     """
     Capital.com API connector for automated trading.
@@ -87,23 +363,260 @@ class CapitalComAPI:
         # Session tokens (set after authentication)
         self.cst_token = None
         self.x_security_token = None
-        self.session = None
         self.account_id = None
-        
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms between requests (10 req/sec)
+        self._token_issued_at = 0.0
+        self._auth_headers = {}  # Rebuilt only when the tokens change
+        self._last_health_ok = float('-inf')
+        
+        # Latest price history per (epic, resolution, max_points), valid until
+        # the next bar closes: {key: (expires_at, prices)}
+        self._price_cache: Dict[Tuple[str, str, int], Tuple[float, List[Dict]]] = {}
+        self._market_cache: Dict[str, Tuple[float, Dict]] = {}
+        
+        # Background keep-alive so a polling loop never blocks on re-login
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+        
+        # Tokens are cached on disk so a restart within the session window
+        # can skip the login POST
+        self._token_cache_path = Path(
+            os.getenv('CAPITAL_SESSION_CACHE', '~/.capital_session.json')
+        ).expanduser()
+        self._load_session_tokens()
         
         # Retry configuration
-        self.max_retries = 3
-        self.retry_delay = 1.0  # Initial retry delay in seconds
+        self.max_retries = 3  # Total attempts per request
+        self.retry_delay = 0.1  # Initial retry delay in seconds
+        self.max_retry_delay = 8.0  # Cap on the exponential backoff
+        
+        # Pooled HTTP session: keep-alive connections are reused across calls
+        # instead of paying a TCP + TLS handshake per request. Transient
+        # failures are retried by urllib3 on the adapter (jittered exponential
+        # backoff, Retry-After honoured); the final response is returned.
+        retry_policy = Retry(
+            total=self.max_retries - 1,
+            backoff_factor=self.retry_delay,
+            backoff_max=self.max_retry_delay,
+            backoff_jitter=self.retry_delay,
+            status_forcelist=TRANSIENT_STATUS_CODES,
+            allowed_methods=('GET', 'POST', 'PUT', 'DELETE'),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session = self._new_http_session(retry_policy, pool_maxsize=20)
+        
+        # Separate single-attempt session for probes (health check, logout)
+        self._probe_session = self._new_http_session(0, pool_maxsize=1)
+        
+        # Rate limiting: token bucket refilled at 10 req/sec on the monotonic
+        # clock, shared by all threads (and the async client)
+        self._rl_rate = 10.0
+        self._rl_capacity = 10.0
+        self._rl_tokens = self._rl_capacity
+        self._rl_last = time.monotonic()
+        self._rl_lock = threading.Lock()
+    
+    def _new_http_session(self, max_retries, pool_maxsize: int) -> requests.Session:
+        """Create a pooled session carrying the static API headers"""
+        session = requests.Session()
+        adapter = _KeepAliveAdapter(pool_connections=10, pool_maxsize=pool_maxsize,
+                                    max_retries=max_retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'X-CAP-API-KEY': self.api_key
+        })
+        return session
+        
+    def _backoff_delay(self, attempt: int, status_code: int = None,
+                       headers: Dict = None) -> float:
+        """
+        Delay before the next retry: capped exponential backoff with jitter.
+        
+        The jitter keeps parallel callers that hit the same 429 from retrying
+        in lockstep. A server-provided Retry-After on 429 takes precedence.
+        
+        Args:
+            attempt: Number of attempts made so far (1-based)
+            status_code: HTTP status of the failed response, if any
+            headers: Headers of the failed response, if any
+        
+        Returns:
+            Delay in seconds
+        """
+        if status_code == 429 and headers and 'Retry-After' in headers:
+            try:
+                return float(headers['Retry-After'])
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+        
+        delay = min(self.max_retry_delay, self.retry_delay * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() * 0.5)
+    
+    def _set_session_tokens(self, cst_token: Optional[str], x_security_token: Optional[str]):
+        """Store session tokens and the auth headers derived from them"""
+        self.cst_token = cst_token
+        self.x_security_token = x_security_token
+        if cst_token and x_security_token:
+            self._auth_headers = {'CST': cst_token, 'X-SECURITY-TOKEN': x_security_token}
+        else:
+            self._auth_headers = {}
+    
+    def _request_headers(self, use_auth: bool, headers: Optional[Dict]) -> Optional[Dict]:
+        """Per-request headers on top of the session's static ones"""
+        req_headers = self._auth_headers if use_auth else None
+        if headers:
+            req_headers = {**(req_headers or {}), **headers}
+        return req_headers
+    
+    def _has_fresh_tokens(self) -> bool:
+        """Whether the current tokens are recent enough to reuse without re-login"""
+        return (bool(self.cst_token and self.x_security_token)
+                and time.time() - self._token_issued_at < SESSION_CACHE_TTL)
+    
+    def _load_session_tokens(self):
+        """Load cached session tokens for this account/environment if still fresh"""
+        try:
+            with open(self._token_cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if (cached.get('base_url') != self.base_url
+                or cached.get('identifier') != self.identifier):
+            return
+        
+        if time.time() - cached.get('ts', 0) >= SESSION_CACHE_TTL:
+            return
+        
+        self._set_session_tokens(cached.get('cst'), cached.get('xst'))
+        self.account_id = cached.get('account_id')
+        self._token_issued_at = cached['ts']
+        logger.info("Reusing cached session tokens")
+    
+    def _save_session_tokens(self):
+        """Persist session tokens (owner-readable only)"""
+        cached = {
+            'cst': self.cst_token,
+            'xst': self.x_security_token,
+            'account_id': self.account_id,
+            'base_url': self.base_url,
+            'identifier': self.identifier,
+            'ts': self._token_issued_at
+        }
+        try:
+            fd = os.open(self._token_cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            logger.warning(f"Could not cache session tokens: {e}")
+    
+    def _clear_session_tokens(self):
+        """Drop in-memory and cached session tokens"""
+        self._set_session_tokens(None, None)
+        self._token_issued_at = 0.0
+        self._last_health_ok = float('-inf')
+        try:
+            self._token_cache_path.unlink()
+        except OSError:
+            pass
+    
+    def _reserve_rate_token(self) -> float:
+        """
+        Take one token from the rate-limit bucket.
         
+        The bucket may go negative: each caller reserves its slot under the
+        lock and then sleeps outside it, so waiters don't block each other.
+        
+        Returns:
+            Seconds to wait before sending the request
+        """
+        with self._rl_lock:
+            now = time.monotonic()
+            self._rl_tokens = min(self._rl_capacity,
+                                  self._rl_tokens + (now - self._rl_last) * self._rl_rate)
+            self._rl_last = now
+            self._rl_tokens -= 1.0
+            return max(0.0, -self._rl_tokens / self._rl_rate)
+    
     def _wait_for_rate_limit(self):
         """Ensure we don't exceed rate limits (10 req/sec)"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time = time.time()
+        delay = self._reserve_rate_token()
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _start_session_refresh(self):
+        """Start the background keep-alive thread if it isn't running"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._session_refresh_loop, name='capital-session-refresh', daemon=True
+        )
+        self._refresh_thread.start()
+    
+    def _stop_session_refresh(self):
+        """Stop the background keep-alive thread"""
+        self._stop_refresh.set()
+    
+    def _session_refresh_loop(self):
+        """
+        Keep the session alive ahead of its inactivity timeout.
+        
+        Pings the API every SESSION_REFRESH_INTERVAL seconds. A ping on an
+        expired session gets a 401, which _make_request answers with a fresh
+        login, so trading calls always find valid tokens.
+        """
+        while not self._stop_refresh.wait(SESSION_REFRESH_INTERVAL):
+            if not self.cst_token:
+                continue
+            try:
+                response = self._make_request('GET', '/api/v1/ping')
+                if response.status_code == 200:
+                    self._token_issued_at = time.time()
+                    self._save_session_tokens()
+                else:
+                    logger.warning(f"Session refresh failed: {response.status_code}")
+            except Exception as e:
+                logger.warning(f"Session refresh failed: {e}")
+    
+    def _cached_prices(self, key: Tuple[str, str, int]) -> Optional[List[Dict]]:
+        """Cached price history for key if no new bar has closed since the fetch"""
+        hit = self._price_cache.get(key)
+        if hit is not None and time.time() < hit[0]:
+            return hit[1]
+        return None
+    
+    def _store_prices(self, key: Tuple[str, str, int], prices: List[Dict]):
+        """Cache price history until the current bar closes"""
+        bar_seconds = RESOLUTION_SECONDS.get(key[1])
+        if bar_seconds is None:
+            return
+        next_close = (time.time() // bar_seconds + 1) * bar_seconds
+        self._price_cache[key] = (next_close, prices)
+    
+    def _json(self, response: requests.Response) -> Any:
+        """Decode a JSON response body"""
+        return _json_loads(response.content)
+    
+    def _ok_json(self, response: requests.Response, key: str = None, error: str = '') -> Any:
+        """
+        Decode a successful response, or raise on any non-200 status.
+        
+        Args:
+            response: Response from _make_request
+            key: Top-level field to return (default: the whole body)
+            error: Message prefix for the raised error
+        
+        Returns:
+            Decoded body, or body[key] (empty list if missing)
+        """
+        if response.status_code != 200:
+            raise CapitalComAPIError(f"{error}: {response.status_code}")
+        body = _json_loads(response.content)
+        return body if key is None else body.get(key, [])
     
     def _is_transient_error(self, status_code: int, error_msg: str = "") -> bool:
         """
@@ -116,16 +629,7 @@ class CapitalComAPI:
         Returns:
             True if error is likely transient
         """
-        # Network/server errors that are worth retrying
-        transient_codes = {
-            408,  # Request Timeout
-            429,  # Too Many Requests
-            500,  # Internal Server Error
-            502,  # Bad Gateway
-            503,  # Service Unavailable
-            504,  # Gateway Timeout
-        }
-        return status_code in transient_codes
+        return status_code in TRANSIENT_STATUS_CODES
     
     def _make_request(
         self, 
@@ -135,7 +639,8 @@ class CapitalComAPI:
         params: Dict = None,
         data: Dict = None,
         use_auth: bool = True,
-        retry: bool = True
+        retry: bool = True,
+        stream: bool = False
     ) -> requests.Response:
         """
         Make HTTP request to Capital.com API with rate limiting and retry logic.
@@ -148,96 +653,82 @@ class CapitalComAPI:
             data: Request body (JSON)
             use_auth: Whether to include authentication tokens
             retry: Whether to retry on transient errors
+            stream: Leave the body unread so it can be parsed incrementally
+                (caller must close the response)
         
         Returns:
             Response object
         """
-        attempt = 0
-        last_exception = None
+        session = self.session if retry else self._probe_session
+        response = self._send(session, method, endpoint, headers, params, data, use_auth, stream)
         
-        while attempt < (self.max_retries if retry else 1):
-            try:
-                self._wait_for_rate_limit()
-                
-                url = f"{self.base_url}{endpoint}"
-                
-                # Build headers
-                req_headers = {
-                    'Content-Type': 'application/json',
-                    'X-CAP-API-KEY': self.api_key
-                }
-                
-                # Add authentication tokens if available and requested
-                if use_auth and self.cst_token and self.x_security_token:
-                    req_headers['CST'] = self.cst_token
-                    req_headers['X-SECURITY-TOKEN'] = self.x_security_token
-                
-                # Merge additional headers
-                if headers:
-                    req_headers.update(headers)
-                
-                # Log request (without sensitive data)
-                logger.debug(f"{method} {endpoint} (attempt {attempt + 1})")
-                
-                response = requests.request(
-                    method=method,
-                    url=url,
-                    headers=req_headers,
-                    params=params,
-                    json=data,
-                    timeout=30
-                )
-                
-                # Log response status
-                logger.debug(f"Response: {response.status_code}")
-                
-                # Check if we should retry on this status code
-                if retry and self._is_transient_error(response.status_code):
-                    attempt += 1
-                    if attempt < self.max_retries:
-                        delay = self.retry_delay * (2 ** (attempt - 1))  # Exponential backoff
-                        logger.warning(f"Transient error {response.status_code}, retrying in {delay}s...")
-                        time.sleep(delay)
-                        continue
-                
-                return response
-                
-            except requests.exceptions.Timeout as e:
-                attempt += 1
-                last_exception = e
-                if attempt < self.max_retries and retry:
-                    delay = self.retry_delay * (2 ** (attempt - 1))
-                    logger.warning(f"Request timeout, retrying in {delay}s...")
-                    time.sleep(delay)
-                else:
-                    logger.error(f"Request failed after {attempt} attempts: {e}")
-                    raise CapitalComAPIError(f"API request timeout: {e}")
-                    
-            except requests.exceptions.ConnectionError as e:
-                attempt += 1
-                last_exception = e
-                if attempt < self.max_retries and retry:
-                    delay = self.retry_delay * (2 ** (attempt - 1))
-                    logger.warning(f"Connection error, retrying in {delay}s...")
-                    time.sleep(delay)
-                else:
-                    logger.error(f"Connection failed after {attempt} attempts: {e}")
-                    raise CapitalComAPIError(f"API connection failed: {e}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request failed: {e}")
-                raise CapitalComAPIError(f"API request failed: {e}")
+        # Session expired: log in again and retry once with fresh tokens
+        if response.status_code == 401 and use_auth and self.cst_token:
+            logger.warning("Session expired, re-authenticating...")
+            response.close()
+            self.authenticate(force=True)
+            response = self._send(session, method, endpoint, headers, params, data, use_auth, stream)
         
-        # If we've exhausted all retries
-        if last_exception:
-            raise CapitalComAPIError(f"Request failed after {self.max_retries} retries: {last_exception}")
+        return response
+    
+    def _send(
+        self,
+        session: requests.Session,
+        method: str,
+        endpoint: str,
+        headers: Optional[Dict],
+        params: Optional[Dict],
+        data: Optional[Dict],
+        use_auth: bool,
+        stream: bool
+    ) -> requests.Response:
+        """Send one rate-limited request (retries happen inside the adapter)"""
+        self._wait_for_rate_limit()
+        
+        url = f"{self.base_url}{endpoint}"
+        
+        # Auth tokens (if requested) plus any extra headers; the API
+        # key and content type live on the session
+        req_headers = self._request_headers(use_auth, headers)
+        
+        # Log request (without sensitive data)
+        logger.debug(f"{method} {endpoint}")
+        
+        try:
+            response = session.request(
+                method=method,
+                url=url,
+                headers=req_headers,
+                params=params,
+                data=_json_dumps(data) if data is not None else None,
+                timeout=30,
+                stream=stream
+            )
+        except requests.exceptions.Timeout as e:
+            logger.error(f"Request timed out: {e}")
+            raise CapitalComAPIError(f"API request timeout: {e}")
+        except requests.exceptions.ConnectionError as e:
+            logger.error(f"Connection failed: {e}")
+            raise CapitalComAPIError(f"API connection failed: {e}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise CapitalComAPIError(f"API request failed: {e}")
+        
+        # Log response status
+        logger.debug(f"Response: {response.status_code}")
+        
+        return response
     
-    def authenticate(self) -> bool:
+    def authenticate(self, force: bool = False) -> bool:
         """
         Authenticate with Capital.com API and obtain session tokens.
         
         Sessions are valid for 10 minutes of inactivity. This method uses
-        the simpler plain-text password authentication method.
+        the simpler plain-text password authentication method. Tokens cached
+        by a recent run are reused instead of logging in again.
+        
+        Args:
+            force: Log in even if cached tokens are still fresh
         
         Returns:
             True if authentication successful
@@ -245,6 +736,11 @@ class CapitalComAPI:
         Raises:
             CapitalComAPIError: If authentication fails
         """
+        if not force and self._has_fresh_tokens():
+            logger.info("✓ Using cached session")
+            self._start_session_refresh()
+            return True
+        
         logger.info("Authenticating with Capital.com API...")
         
         endpoint = '/api/v1/session'
@@ -266,22 +762,25 @@ class CapitalComAPI:
             
             if response.status_code == 200:
                 # Extract session tokens from headers
-                self.cst_token = response.headers.get('CST')
-                self.x_security_token = response.headers.get('X-SECURITY-TOKEN')
+                self._set_session_tokens(response.headers.get('CST'),
+                                         response.headers.get('X-SECURITY-TOKEN'))
                 
                 if not self.cst_token or not self.x_security_token:
                     raise CapitalComAPIError("Authentication succeeded but tokens not found in response")
                 
                 # Get session details
-                session_data = response.json()
+                session_data = self._json(response)
                 self.account_id = session_data.get('currentAccountId')
+                self._token_issued_at = time.time()
+                self._save_session_tokens()
+                self._start_session_refresh()
                 
                 logger.info("✓ Authentication successful")
                 logger.info(f"Account ID: {self.account_id}")
                 
                 return True
             else:
-                error_msg = response.json().get('errorCode', 'Unknown error')
+                error_msg = self._json(response).get('errorCode', 'Unknown error')
                 raise CapitalComAPIError(
                     f"Authentication failed: {response.status_code} - {error_msg}"
                 )
@@ -300,14 +799,10 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        response = self._make_request('GET', '/api/v1/accounts')
-        
-        if response.status_code == 200:
-            accounts = response.json().get('accounts', [])
-            logger.info(f"Retrieved {len(accounts)} account(s)")
-            return accounts
-        else:
-            raise CapitalComAPIError(f"Failed to get accounts: {response.status_code}")
+        accounts = self._ok_json(self._make_request('GET', '/api/v1/accounts'),
+                                 'accounts', "Failed to get accounts")
+        logger.info(f"Retrieved {len(accounts)} account(s)")
+        return accounts
     
     def get_account_balance(self) -> Dict:
         """
@@ -319,28 +814,7 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        accounts = self.get_accounts()
-        
-        if not accounts:
-            raise CapitalComAPIError("No accounts found")
-        
-        # Get the current account (first one or match account_id)
-        account = accounts[0]
-        
-        balance_info = {
-            'account_id': account.get('accountId'),
-            'account_name': account.get('accountName'),
-            'balance': account.get('balance', {}).get('balance', 0),
-            'deposit': account.get('balance', {}).get('deposit', 0),
-            'profit_loss': account.get('balance', {}).get('profitLoss', 0),
-            'available': account.get('balance', {}).get('available', 0),
-            'currency': account.get('currency', 'USD')
-        }
-        
-        logger.info(f"Balance: {balance_info['balance']} {balance_info['currency']}")
-        logger.info(f"Available: {balance_info['available']} {balance_info['currency']}")
-        
-        return balance_info
+        return _balance_info(self.get_accounts())
     
     def get_historical_prices(
         self, 
@@ -348,11 +822,16 @@ class CapitalComAPI:
         resolution: str = 'HOUR',
         max_points: int = 100,
         from_date: Optional[str] = None,
-        to_date: Optional[str] = None
+        to_date: Optional[str] = None,
+        use_cache: bool = True
     ) -> List[Dict]:
         """
         Get historical price data for an instrument.
         
+        Without a date range, the result is cached until the next bar of this
+        resolution closes, so polling faster than the bar length costs no
+        extra requests. Pass use_cache=False to see the still-forming bar.
+        
         Args:
             epic: Instrument identifier (e.g., 'GOLD', 'US500', 'EURUSD')
             resolution: Price resolution - MINUTE, MINUTE_5, MINUTE_15, MINUTE_30,
@@ -360,6 +839,7 @@ class CapitalComAPI:
             max_points: Maximum number of data points (default 100, max 1000)
             from_date: Start date in format 'YYYY-MM-DDTHH:MM:SS'
             to_date: End date in format 'YYYY-MM-DDTHH:MM:SS'
+            use_cache: Reuse prices fetched during the current bar (default: True)
         
         Returns:
             List of price dictionaries with OHLC data
@@ -367,7 +847,14 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        endpoint = f'/api/v1/prices/{epic}'
+        cache_key = None
+        if use_cache and not from_date and not to_date:
+            cache_key = (epic, resolution, max_points)
+            cached = self._cached_prices(cache_key)
+            if cached is not None:
+                return cached
+        
+        endpoint = _price_endpoint(epic)
         
         params = {
             'resolution': resolution,
@@ -379,24 +866,131 @@ class CapitalComAPI:
         if to_date:
             params['to'] = to_date
         
-        response = self._make_request('GET', endpoint, params=params)
+        prices = self._ok_json(self._make_request('GET', endpoint, params=params),
+                               'prices', f"Failed to get prices for {epic}")
+        logger.info(f"Retrieved {len(prices)} price bars for {epic}")
         
-        if response.status_code == 200:
-            data = response.json()
-            prices = data.get('prices', [])
-            logger.info(f"Retrieved {len(prices)} price bars for {epic}")
-            return prices
-        else:
-            raise CapitalComAPIError(
-                f"Failed to get prices for {epic}: {response.status_code}"
+        if cache_key is not None:
+            self._store_prices(cache_key, prices)
+        return prices
+    
+    def get_historical_prices_df(
+        self,
+        epic: str,
+        resolution: str = 'HOUR',
+        max_points: int = 100,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Get historical price data for an instrument as a DataFrame.
+        
+        Same arguments as get_historical_prices().
+        
+        Returns:
+            DataFrame indexed by bar time with open, high, low, close (bid)
+            and volume columns
+        """
+        if not IJSON_AVAILABLE:
+            return prices_to_frame(
+                self.get_historical_prices(epic, resolution, max_points, from_date, to_date)
             )
+        
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        max_points = min(max_points, 1000)  # Cap at API limit
+        params = {'resolution': resolution, 'max': max_points}
+        if from_date:
+            params['from'] = from_date
+        if to_date:
+            params['to'] = to_date
+        
+        # Parse the body as it arrives instead of materializing it first
+        response = self._make_request('GET', _price_endpoint(epic), params=params, stream=True)
+        try:
+            if response.status_code != 200:
+                raise CapitalComAPIError(
+                    f"Failed to get prices for {epic}: {response.status_code}"
+                )
+            response.raw.decode_content = True
+            prices = _stream_prices_to_frame(response.raw, max_points)
+        finally:
+            response.close()
+        
+        logger.info(f"Retrieved {len(prices)} price bars for {epic}")
+        return prices
+    
+    def par_map(self, fn: Callable, items: Iterable, max_workers: int = 8) -> List:
+        """
+        Apply an API call to many items on a thread pool.
+        
+        Lets existing per-symbol loops run in parallel without an async
+        rewrite; requests share the pooled session and rate limiter.
+        
+        Usage:
+            prices = dict(zip(epics, api.par_map(api.get_historical_prices, epics)))
+        
+        Args:
+            fn: Callable taking one item (e.g. api.get_market_details)
+            items: Items to map over
+            max_workers: Number of concurrent requests (default: 8)
+        
+        Returns:
+            List of results in input order. The first exception raised by
+            fn is re-raised.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fn, items))
+    
+    def get_historical_prices_many(
+        self,
+        epics: List[str],
+        resolution: str = 'HOUR',
+        max_points: int = 100,
+        max_workers: int = 8
+    ) -> Dict[str, List[Dict]]:
+        """
+        Get historical prices for several instruments concurrently.
+        
+        Requests overlap on a thread pool (still spaced by the rate limiter),
+        so N instruments cost roughly N x 100ms instead of N round trips.
+        
+        Args:
+            epics: Instrument identifiers
+            resolution: Price resolution (see get_historical_prices)
+            max_points: Maximum number of data points per instrument
+            max_workers: Number of concurrent requests (default: 8)
+        
+        Returns:
+            Dictionary mapping epic to its price list. Epics whose request
+            failed are logged and left out.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                epic: executor.submit(self.get_historical_prices, epic, resolution, max_points)
+                for epic in epics
+            }
+            for epic, future in futures.items():
+                try:
+                    results[epic] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to get prices for {epic}: {e}")
+        
+        return results
     
-    def get_market_details(self, epic: str) -> Dict:
+    def get_market_details(self, epic: str, max_age: float = MARKET_DETAILS_TTL) -> Dict:
         """
         Get detailed information about a specific market.
         
         Args:
             epic: Instrument identifier
+            max_age: Reuse a snapshot fetched at most this many seconds ago
+                (default: MARKET_DETAILS_TTL; 0 always fetches)
         
         Returns:
             Dictionary with market details, trading hours, margins, etc.
@@ -404,17 +998,16 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        endpoint = f'/api/v1/markets/{epic}'
-        response = self._make_request('GET', endpoint)
+        hit = self._market_cache.get(epic)
+        if hit is not None and time.monotonic() - hit[0] < max_age:
+            return hit[1]
         
-        if response.status_code == 200:
-            market_data = response.json()
-            logger.info(f"Retrieved market details for {epic}")
-            return market_data
-        else:
-            raise CapitalComAPIError(
-                f"Failed to get market details: {response.status_code}"
-            )
+        endpoint = _market_endpoint(epic)
+        market_data = self._ok_json(self._make_request('GET', endpoint),
+                                    error="Failed to get market details")
+        self._market_cache[epic] = (time.monotonic(), market_data)
+        logger.info(f"Retrieved market details for {epic}")
+        return market_data
     
     def get_positions(self) -> List[Dict]:
         """
@@ -426,16 +1019,10 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        response = self._make_request('GET', '/api/v1/positions')
-        
-        if response.status_code == 200:
-            positions = response.json().get('positions', [])
-            logger.info(f"Retrieved {len(positions)} open position(s)")
-            return positions
-        else:
-            raise CapitalComAPIError(
-                f"Failed to get positions: {response.status_code}"
-            )
+        positions = self._ok_json(self._make_request('GET', '/api/v1/positions'),
+                                  'positions', "Failed to get positions")
+        logger.info(f"Retrieved {len(positions)} open position(s)")
+        return positions
     
     def create_position(
         self,
@@ -463,42 +1050,69 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        # Validate direction
-        direction = direction.upper()
-        if direction not in ['BUY', 'SELL']:
-            raise ValueError("direction must be 'BUY' or 'SELL'")
-        
-        # Build position request
-        position_data = {
-            'epic': epic,
-            'direction': direction,
-            'size': size,
-            'guaranteedStop': guaranteed_stop
-        }
-        
-        # Add stop loss if provided
-        if stop_loss:
-            position_data['stopLevel'] = stop_loss
-        
-        # Add take profit if provided
-        if take_profit:
-            position_data['profitLevel'] = take_profit
+        position_data = _position_request(epic, direction, size, stop_loss,
+                                          take_profit, guaranteed_stop)
         
-        logger.info(f"Creating {direction} position: {epic} size={size}")
+        logger.info(f"Creating {position_data['direction']} position: {epic} size={size}")
         
         response = self._make_request('POST', '/api/v1/positions', data=position_data)
         
         if response.status_code == 200:
-            result = response.json()
+            result = self._json(response)
             deal_reference = result.get('dealReference')
             logger.info(f"✓ Position created: {deal_reference}")
             return result
         else:
-            error = response.json() if response.text else {}
+            error = self._json(response) if response.content else {}
             raise CapitalComAPIError(
                 f"Failed to create position: {response.status_code} - {error}"
             )
     
+    def create_positions_batch(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Create several market positions at once (e.g. both legs of a spread).
+        
+        Capital.com has no batch-order endpoint, so the orders are submitted
+        concurrently on a thread pool; all legs go out within one round trip
+        instead of one after another.
+        
+        Usage:
+            api.create_positions_batch([
+                {'epic': 'SLV', 'direction': 'BUY', 'size': 1.0, 'stop_loss': 20.0},
+                {'epic': 'SIVR', 'direction': 'SELL', 'size': 1.0},
+            ])
+        
+        Args:
+            orders: create_position keyword arguments, one dict per order
+        
+        Returns:
+            List of create_position results in order
+        
+        Raises:
+            CapitalComAPIError: If any order failed. Every order is still
+                attempted; the message lists the deal references that did
+                go through so they can be unwound.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        if not orders:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=len(orders)) as executor:
+            futures = [executor.submit(self.create_position, **order) for order in orders]
+        
+        results, errors = _split_outcomes([order.get('epic') for order in orders],
+                                          [_future_outcome(future) for future in futures])
+        if errors:
+            opened = [result.get('dealReference') for result in results]
+            raise CapitalComAPIError(
+                f"Failed to create {len(errors)}/{len(orders)} position(s): "
+                f"{'; '.join(errors)} (opened: {opened})"
+            )
+        
+        return results
+    
     def close_position(self, deal_id: str) -> Dict:
         """
         Close an existing position.
@@ -512,20 +1126,50 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        endpoint = f'/api/v1/positions/{deal_id}'
+        endpoint = _position_endpoint(deal_id)
         
         logger.info(f"Closing position: {deal_id}")
         
-        response = self._make_request('DELETE', endpoint)
+        result = self._ok_json(self._make_request('DELETE', endpoint),
+                               error="Failed to close position")
+        logger.info(f"✓ Position closed: {deal_id}")
+        return result
+    
+    def close_positions_batch(self, deal_ids: List[str], max_workers: int = 8) -> List[Dict]:
+        """
+        Close several positions at once (e.g. both legs of a spread).
+        
+        Capital.com has no batch-close endpoint, so the closes are submitted
+        concurrently on a thread pool; flattening N positions costs about
+        one round trip instead of N.
         
-        if response.status_code == 200:
-            result = response.json()
-            logger.info(f"✓ Position closed: {deal_id}")
-            return result
-        else:
+        Args:
+            deal_ids: Deal IDs of the positions to close
+            max_workers: Number of concurrent requests (default: 8)
+        
+        Returns:
+            List of close_position results in order
+        
+        Raises:
+            CapitalComAPIError: If any close failed. Every close is still
+                attempted; the message lists the deal IDs left open.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        if not deal_ids:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(deal_ids))) as executor:
+            futures = [executor.submit(self.close_position, deal_id) for deal_id in deal_ids]
+        
+        results, errors = _split_outcomes(deal_ids, [_future_outcome(future) for future in futures])
+        if errors:
             raise CapitalComAPIError(
-                f"Failed to close position: {response.status_code}"
+                f"Failed to close {len(errors)}/{len(deal_ids)} position(s): {'; '.join(errors)}"
             )
+        
+        return results
     
     def update_position(
         self,
@@ -547,29 +1191,15 @@ class CapitalComAPI:
         if not self.cst_token:
             raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
         
-        endpoint = f'/api/v1/positions/{deal_id}'
-        
-        update_data = {}
-        if stop_loss is not None:
-            update_data['stopLevel'] = stop_loss
-        if take_profit is not None:
-            update_data['profitLevel'] = take_profit
-        
-        if not update_data:
-            raise ValueError("Must provide at least stop_loss or take_profit")
+        endpoint = _position_endpoint(deal_id)
+        update_data = _update_request(stop_loss, take_profit)
         
         logger.info(f"Updating position {deal_id}: {update_data}")
         
-        response = self._make_request('PUT', endpoint, data=update_data)
-        
-        if response.status_code == 200:
-            result = response.json()
-            logger.info(f"✓ Position updated: {deal_id}")
-            return result
-        else:
-            raise CapitalComAPIError(
-                f"Failed to update position: {response.status_code}"
-            )
+        result = self._ok_json(self._make_request('PUT', endpoint, data=update_data),
+                               error="Failed to update position")
+        logger.info(f"✓ Position updated: {deal_id}")
+        return result
     
     def validate_order_parameters(
         self,
@@ -593,7 +1223,8 @@ class CapitalComAPI:
             (is_valid, error_message) tuple
         """
         # Check direction
-        if direction.upper() not in ['BUY', 'SELL']:
+        side = direction.upper()
+        if side not in VALID_DIRECTIONS:
             return False, f"Invalid direction: {direction}"
         
         # Check size
@@ -605,7 +1236,7 @@ class CapitalComAPI:
         
         # Check stop loss vs take profit logic
         if stop_loss and take_profit:
-            if direction.upper() == 'BUY':
+            if side == 'BUY':
                 if stop_loss >= take_profit:
                     return False, f"For BUY: stop_loss ({stop_loss}) must be < take_profit ({take_profit})"
             else:  # SELL
@@ -618,21 +1249,43 @@ class CapitalComAPI:
         """
         Check if API connection is healthy.
         
+        Uses the lightweight ping endpoint (which also keeps the session
+        alive) and reuses a successful result for HEALTH_CHECK_TTL seconds.
+        
         Returns:
             True if API is accessible and responsive
         """
+        now = time.monotonic()
+        if now - self._last_health_ok < HEALTH_CHECK_TTL:
+            return True
+        
         try:
-            # Try to get account info as a health check
             if not self.cst_token:
                 return False
             
-            response = self._make_request('GET', '/api/v1/accounts', retry=False)
-            return response.status_code == 200
+            response = self._make_request('GET', '/api/v1/ping', retry=False)
+            ok = response.status_code == 200
+            if ok:
+                self._last_health_ok = now
+            return ok
         except:
             return False
     
+    def close(self):
+        """
+        Release local connections but leave the broker session open.
+        
+        The session tokens stay cached on disk, so the next process within
+        SESSION_CACHE_TTL authenticates without a login round trip.
+        """
+        self._stop_session_refresh()
+        self.session.close()
+        self._probe_session.close()
+    
     def logout(self):
         """Close the current session"""
+        self._stop_session_refresh()
+        
         if not self.cst_token:
             logger.info("Not authenticated, no session to close")
             return
@@ -641,8 +1294,681 @@ class CapitalComAPI:
             response = self._make_request('DELETE', '/api/v1/session', retry=False)
             if response.status_code == 200:
                 logger.info("✓ Session closed successfully")
-            self.cst_token = None
-            self.x_security_token = None
+            self._clear_session_tokens()
+        except Exception as e:
+            logger.warning(f"Error closing session: {e}")
+        finally:
+            self.session.close()
+            self._probe_session.close()
+
+
+class AsyncCapitalComAPI(CapitalComAPI):
+    """
+    asyncio variant of the connector for concurrent requests.
+    
+    Account, market data and order calls (create/close/update position and
+    their batch forms) are coroutines on one keep-alive aiohttp pool, so
+    polling several instruments or placing both legs of a spread costs
+    about one round trip instead of one per call, without a thread per
+    request. Every public method that talks to the API is a coroutine here;
+    only validate_order_parameters is shared unchanged.
+    
+    Requires the optional `aiohttp` package.
+    
+    Usage:
+        async with AsyncCapitalComAPI() as api:
+            await api.authenticate()
+            prices = await asyncio.gather(
+                *(api.get_historical_prices(epic) for epic in ['GOLD', 'SILVER'])
+            )
+    """
+    
+    def __init__(self, environment: str = None, max_concurrency: int = 10):
+        """
+        Initialize async Capital.com API connector.
+        
+        Args:
+            environment: 'DEMO' or 'LIVE'. If None, reads from .env file
+            max_concurrency: Maximum number of requests in flight (default: 10)
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise CapitalComAPIError(
+                "aiohttp is required for AsyncCapitalComAPI. Install it with: pip install aiohttp"
+            )
+        
+        super().__init__(environment)
+        
+        self.max_concurrency = max_concurrency
+        self.async_session = None
+        self._request_slots = None
+        self._refresh_task = None
+    
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        self.async_session = aiohttp.ClientSession(
+            connector=connector,
+            headers=dict(self.session.headers),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+        self._request_slots = asyncio.Semaphore(self.max_concurrency)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Close the aiohttp and requests sessions"""
+        self._stop_session_refresh()
+        if self.async_session is not None:
+            await self.async_session.close()
+            self.async_session = None
+        self.session.close()
+        self._probe_session.close()
+    
+    async def _wait_for_rate_limit(self):
+        """Ensure we don't exceed rate limits (10 req/sec)"""
+        delay = self._reserve_rate_token()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _start_session_refresh(self):
+        """Start the keep-alive task on the running event loop if it isn't running"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(
+            self._session_refresh_loop(), name='capital-session-refresh'
+        )
+    
+    def _stop_session_refresh(self):
+        """Cancel the keep-alive task"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+    
+    async def _session_refresh_loop(self):
+        """
+        Keep the session alive ahead of its inactivity timeout.
+        
+        Event-loop counterpart of the sync client's refresh thread: pings
+        every SESSION_REFRESH_INTERVAL seconds, and a 401 on an expired
+        session is answered with a fresh login by _make_request.
+        """
+        while True:
+            await asyncio.sleep(SESSION_REFRESH_INTERVAL)
+            if not self.cst_token:
+                continue
+            try:
+                status, _, _ = await self._make_request('GET', '/api/v1/ping')
+                if status == 200:
+                    self._token_issued_at = time.time()
+                    self._save_session_tokens()
+                else:
+                    logger.warning(f"Session refresh failed: {status}")
+            except Exception as e:
+                logger.warning(f"Session refresh failed: {e}")
+    
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Dict = None,
+        params: Dict = None,
+        data: Dict = None,
+        use_auth: bool = True,
+        retry: bool = True
+    ) -> Tuple[int, Dict, Any]:
+        """
+        Make HTTP request to Capital.com API with rate limiting and retry logic.
+        
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            endpoint: API endpoint (e.g., '/api/v1/session')
+            headers: Additional headers
+            params: Query parameters
+            data: Request body (JSON)
+            use_auth: Whether to include authentication tokens
+            retry: Whether to retry on transient errors
+        
+        Returns:
+            (status_code, response_headers, json_body) tuple
+        """
+        if self.async_session is None:
+            raise CapitalComAPIError("Session not open. Use 'async with AsyncCapitalComAPI() as api:'")
+        
+        attempt = 0
+        last_exception = None
+        reauthenticated = False
+        
+        while attempt < (self.max_retries if retry else 1):
+            try:
+                async with self._request_slots:
+                    await self._wait_for_rate_limit()
+                    
+                    url = f"{self.base_url}{endpoint}"
+                    
+                    req_headers = self._request_headers(use_auth, headers)
+                    
+                    logger.debug(f"{method} {endpoint} (attempt {attempt + 1})")
+                    
+                    async with self.async_session.request(
+                        method, url, headers=req_headers, params=params,
+                        data=_json_dumps(data) if data is not None else None
+                    ) as response:
+                        status = response.status
+                        resp_headers = response.headers.copy()
+                        raw = await response.read()
+                
+                body = _json_loads(raw) if raw else None
+                
+                logger.debug(f"Response: {status}")
+                
+                if status == 401 and use_auth and self.cst_token and not reauthenticated:
+                    logger.warning("Session expired, re-authenticating...")
+                    reauthenticated = True
+                    await self.authenticate(force=True)
+                    continue
+                
+                if retry and self._is_transient_error(status):
+                    attempt += 1
+                    if attempt < self.max_retries:
+                        delay = self._backoff_delay(attempt, status, resp_headers)
+                        logger.warning(f"Transient error {status}, retrying in {delay:.2f}s...")
+                        await asyncio.sleep(delay)
+                        continue
+                
+                return status, resp_headers, body
+                
+            except asyncio.TimeoutError as e:
+                attempt += 1
+                last_exception = e
+                if attempt < self.max_retries and retry:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"Request timeout, retrying in {delay:.2f}s...")
+                    await asyncio.sleep(delay)
+                else:
+                    logger.error(f"Request failed after {attempt} attempts: {e}")
+                    raise CapitalComAPIError(f"API request timeout: {e}")
+                    
+            except aiohttp.ClientConnectionError as e:
+                attempt += 1
+                last_exception = e
+                if attempt < self.max_retries and retry:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"Connection error, retrying in {delay:.2f}s...")
+                    await asyncio.sleep(delay)
+                else:
+                    logger.error(f"Connection failed after {attempt} attempts: {e}")
+                    raise CapitalComAPIError(f"API connection failed: {e}")
+                    
+            except aiohttp.ClientError as e:
+                logger.error(f"Request failed: {e}")
+                raise CapitalComAPIError(f"API request failed: {e}")
+        
+        # If we've exhausted all retries
+        if last_exception:
+            raise CapitalComAPIError(f"Request failed after {self.max_retries} retries: {last_exception}")
+    
+    async def authenticate(self, force: bool = False) -> bool:
+        """
+        Authenticate with Capital.com API and obtain session tokens.
+        
+        Args:
+            force: Log in even if cached tokens are still fresh
+        
+        Returns:
+            True if authentication successful
+        
+        Raises:
+            CapitalComAPIError: If authentication fails
+        """
+        if not force and self._has_fresh_tokens():
+            logger.info("✓ Using cached session")
+            self._start_session_refresh()
+            return True
+        
+        logger.info("Authenticating with Capital.com API...")
+        
+        auth_data = {
+            'identifier': self.identifier,
+            'password': self.api_password,
+            'encryptedPassword': False
+        }
+        
+        status, headers, body = await self._make_request(
+            'POST', '/api/v1/session', data=auth_data, use_auth=False
+        )
+        
+        if status != 200:
+            error_msg = (body or {}).get('errorCode', 'Unknown error')
+            raise CapitalComAPIError(f"Authentication failed: {status} - {error_msg}")
+        
+        self._set_session_tokens(headers.get('CST'), headers.get('X-SECURITY-TOKEN'))
+        
+        if not self.cst_token or not self.x_security_token:
+            raise CapitalComAPIError("Authentication succeeded but tokens not found in response")
+        
+        self.account_id = (body or {}).get('currentAccountId')
+        self._token_issued_at = time.time()
+        self._save_session_tokens()
+        self._start_session_refresh()
+        
+        logger.info("✓ Authentication successful")
+        logger.info(f"Account ID: {self.account_id}")
+        
+        return True
+    
+    async def get_accounts(self) -> List[Dict]:
+        """
+        Get list of all trading accounts.
+        
+        Returns:
+            List of account dictionaries with details
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        status, _, body = await self._make_request('GET', '/api/v1/accounts')
+        
+        if status == 200:
+            accounts = body.get('accounts', [])
+            logger.info(f"Retrieved {len(accounts)} account(s)")
+            return accounts
+        else:
+            raise CapitalComAPIError(f"Failed to get accounts: {status}")
+    
+    async def get_account_balance(self) -> Dict:
+        """
+        Get current account balance and equity.
+        
+        Returns:
+            Dictionary with balance, available funds, P&L, etc.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        return _balance_info(await self.get_accounts())
+    
+    async def get_historical_prices(
+        self,
+        epic: str,
+        resolution: str = 'HOUR',
+        max_points: int = 100,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """
+        Get historical price data for an instrument.
+        
+        Args:
+            epic: Instrument identifier (e.g., 'GOLD', 'US500', 'EURUSD')
+            resolution: Price resolution (MINUTE ... WEEK)
+            max_points: Maximum number of data points (default 100, max 1000)
+            from_date: Start date in format 'YYYY-MM-DDTHH:MM:SS'
+            to_date: End date in format 'YYYY-MM-DDTHH:MM:SS'
+            use_cache: Reuse prices fetched during the current bar (default: True)
+        
+        Returns:
+            List of price dictionaries with OHLC data
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        cache_key = None
+        if use_cache and not from_date and not to_date:
+            cache_key = (epic, resolution, max_points)
+            cached = self._cached_prices(cache_key)
+            if cached is not None:
+                return cached
+        
+        params = {
+            'resolution': resolution,
+            'max': min(max_points, 1000)  # Cap at API limit
+        }
+        if from_date:
+            params['from'] = from_date
+        if to_date:
+            params['to'] = to_date
+        
+        status, _, body = await self._make_request('GET', _price_endpoint(epic), params=params)
+        
+        if status == 200:
+            prices = body.get('prices', [])
+            logger.info(f"Retrieved {len(prices)} price bars for {epic}")
+            if cache_key is not None:
+                self._store_prices(cache_key, prices)
+            return prices
+        else:
+            raise CapitalComAPIError(f"Failed to get prices for {epic}: {status}")
+    
+    async def get_historical_prices_df(
+        self,
+        epic: str,
+        resolution: str = 'HOUR',
+        max_points: int = 100,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Get historical price data for an instrument as a DataFrame.
+        
+        Same arguments as get_historical_prices().
+        
+        Returns:
+            DataFrame indexed by bar time with open, high, low, close (bid)
+            and volume columns
+        """
+        return prices_to_frame(
+            await self.get_historical_prices(epic, resolution, max_points, from_date, to_date)
+        )
+    
+    async def par_map(self, fn: Callable, items: Iterable, max_workers: int = 8) -> List:
+        """
+        Await a coroutine API call for many items concurrently.
+        
+        Usage:
+            prices = dict(zip(epics, await api.par_map(api.get_historical_prices, epics)))
+        
+        Args:
+            fn: Coroutine function taking one item (e.g. api.get_market_details)
+            items: Items to map over
+            max_workers: Number of calls in flight (default: 8)
+        
+        Returns:
+            List of results in input order. The first exception raised by
+            fn is re-raised.
+        """
+        slots = asyncio.Semaphore(max_workers)
+        
+        async def call(item):
+            async with slots:
+                return await fn(item)
+        
+        return list(await asyncio.gather(*(call(item) for item in items)))
+    
+    async def get_historical_prices_many(
+        self,
+        epics: List[str],
+        resolution: str = 'HOUR',
+        max_points: int = 100,
+        max_workers: int = 8
+    ) -> Dict[str, List[Dict]]:
+        """
+        Get historical prices for several instruments concurrently.
+        
+        Args:
+            epics: Instrument identifiers
+            resolution: Price resolution (see get_historical_prices)
+            max_points: Maximum number of data points per instrument
+            max_workers: Number of requests in flight for this batch (default: 8)
+        
+        Returns:
+            Dictionary mapping epic to its price list. Epics whose request
+            failed are logged and left out.
+        """
+        slots = asyncio.Semaphore(max_workers)
+        
+        async def fetch(epic):
+            async with slots:
+                return await self.get_historical_prices(epic, resolution, max_points)
+        
+        fetched = await asyncio.gather(*(fetch(epic) for epic in epics), return_exceptions=True)
+        
+        results = {}
+        for epic, prices in zip(epics, fetched):
+            if isinstance(prices, Exception):
+                logger.error(f"Failed to get prices for {epic}: {prices}")
+            else:
+                results[epic] = prices
+        
+        return results
+    
+    async def get_market_details(self, epic: str, max_age: float = MARKET_DETAILS_TTL) -> Dict:
+        """
+        Get detailed information about a specific market.
+        
+        Args:
+            epic: Instrument identifier
+            max_age: Reuse a snapshot fetched at most this many seconds ago
+                (default: MARKET_DETAILS_TTL; 0 always fetches)
+        
+        Returns:
+            Dictionary with market details, trading hours, margins, etc.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        hit = self._market_cache.get(epic)
+        if hit is not None and time.monotonic() - hit[0] < max_age:
+            return hit[1]
+        
+        status, _, body = await self._make_request('GET', _market_endpoint(epic))
+        
+        if status == 200:
+            self._market_cache[epic] = (time.monotonic(), body)
+            logger.info(f"Retrieved market details for {epic}")
+            return body
+        else:
+            raise CapitalComAPIError(f"Failed to get market details: {status}")
+    
+    async def get_positions(self) -> List[Dict]:
+        """
+        Get all open positions.
+        
+        Returns:
+            List of position dictionaries
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        status, _, body = await self._make_request('GET', '/api/v1/positions')
+        
+        if status == 200:
+            positions = body.get('positions', [])
+            logger.info(f"Retrieved {len(positions)} open position(s)")
+            return positions
+        else:
+            raise CapitalComAPIError(f"Failed to get positions: {status}")
+    
+    async def create_position(
+        self,
+        epic: str,
+        direction: str,
+        size: float,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        guaranteed_stop: bool = False
+    ) -> Dict:
+        """
+        Create a new market position.
+        
+        Args:
+            epic: Instrument identifier
+            direction: 'BUY' or 'SELL'
+            size: Position size in lots/units
+            stop_loss: Stop loss level (price)
+            take_profit: Take profit level (price)
+            guaranteed_stop: Use guaranteed stop loss (may have premium)
+        
+        Returns:
+            Dictionary with deal reference and status
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        position_data = _position_request(epic, direction, size, stop_loss,
+                                          take_profit, guaranteed_stop)
+        
+        logger.info(f"Creating {position_data['direction']} position: {epic} size={size}")
+        
+        status, _, body = await self._make_request('POST', '/api/v1/positions', data=position_data)
+        
+        if status == 200:
+            logger.info(f"✓ Position created: {body.get('dealReference')}")
+            return body
+        else:
+            raise CapitalComAPIError(f"Failed to create position: {status} - {body or {}}")
+    
+    async def close_position(self, deal_id: str) -> Dict:
+        """
+        Close an existing position.
+        
+        Args:
+            deal_id: Deal ID of the position to close
+        
+        Returns:
+            Dictionary with deal reference
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        logger.info(f"Closing position: {deal_id}")
+        
+        status, _, body = await self._make_request('DELETE', _position_endpoint(deal_id))
+        
+        if status == 200:
+            logger.info(f"✓ Position closed: {deal_id}")
+            return body
+        else:
+            raise CapitalComAPIError(f"Failed to close position: {status}")
+    
+    async def create_positions_batch(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Create several market positions at once (e.g. both legs of a spread).
+        
+        The orders are gathered on the event loop and share the keep-alive
+        connection pool, so all legs go out within one round trip without
+        a thread per order.
+        
+        Args:
+            orders: create_position keyword arguments, one dict per order
+        
+        Returns:
+            List of create_position results in order
+        
+        Raises:
+            CapitalComAPIError: If any order failed. Every order is still
+                attempted; the message lists the deal references that did
+                go through so they can be unwound.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        outcomes = await asyncio.gather(
+            *(self.create_position(**order) for order in orders), return_exceptions=True
+        )
+        
+        results, errors = _split_outcomes([order.get('epic') for order in orders], outcomes)
+        if errors:
+            opened = [result.get('dealReference') for result in results]
+            raise CapitalComAPIError(
+                f"Failed to create {len(errors)}/{len(orders)} position(s): "
+                f"{'; '.join(errors)} (opened: {opened})"
+            )
+        
+        return results
+    
+    async def close_positions_batch(self, deal_ids: List[str]) -> List[Dict]:
+        """
+        Close several positions at once (e.g. both legs of a spread).
+        
+        Args:
+            deal_ids: Deal IDs of the positions to close
+        
+        Returns:
+            List of close_position results in order
+        
+        Raises:
+            CapitalComAPIError: If any close failed. Every close is still
+                attempted; the message lists the deal IDs left open.
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        outcomes = await asyncio.gather(
+            *(self.close_position(deal_id) for deal_id in deal_ids), return_exceptions=True
+        )
+        
+        results, errors = _split_outcomes(deal_ids, outcomes)
+        if errors:
+            raise CapitalComAPIError(
+                f"Failed to close {len(errors)}/{len(deal_ids)} position(s): {'; '.join(errors)}"
+            )
+        
+        return results
+    
+    async def update_position(
+        self,
+        deal_id: str,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None
+    ) -> Dict:
+        """
+        Update stop loss and/or take profit for an existing position.
+        
+        Args:
+            deal_id: Deal ID of position to update
+            stop_loss: New stop loss level
+            take_profit: New take profit level
+        
+        Returns:
+            Dictionary with deal reference
+        """
+        if not self.cst_token:
+            raise CapitalComAPIError("Not authenticated. Call authenticate() first.")
+        
+        update_data = _update_request(stop_loss, take_profit)
+        
+        logger.info(f"Updating position {deal_id}: {update_data}")
+        
+        status, _, body = await self._make_request('PUT', _position_endpoint(deal_id),
+                                                   data=update_data)
+        
+        if status == 200:
+            logger.info(f"✓ Position updated: {deal_id}")
+            return body
+        else:
+            raise CapitalComAPIError(f"Failed to update position: {status} - {body or {}}")
+    
+    async def check_api_health(self) -> bool:
+        """
+        Check if API connection is healthy.
+        
+        Pings the API, reusing a successful result for HEALTH_CHECK_TTL seconds.
+        
+        Returns:
+            True if API is accessible and responsive
+        """
+        now = time.monotonic()
+        if now - self._last_health_ok < HEALTH_CHECK_TTL:
+            return True
+        
+        if not self.cst_token:
+            return False
+        
+        try:
+            status, _, _ = await self._make_request('GET', '/api/v1/ping', retry=False)
+        except CapitalComAPIError:
+            return False
+        
+        ok = status == 200
+        if ok:
+            self._last_health_ok = now
+        return ok
+    
+    async def logout(self):
+        """Close the current session"""
+        self._stop_session_refresh()
+        
+        if not self.cst_token:
+            logger.info("Not authenticated, no session to close")
+            return
+        
+        try:
+            status, _, _ = await self._make_request('DELETE', '/api/v1/session', retry=False)
+            if status == 200:
+                logger.info("✓ Session closed successfully")
+            self._clear_session_tokens()
         except Exception as e:
             logger.warning(f"Error closing session: {e}")
 
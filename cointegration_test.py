@@ -6,17 +6,260 @@ Tests whether two time series are cointegrated (move together in the long term).
 This is essential for pairs trading strategies.
 """
 
+import math
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.stattools import adfuller, coint
-from statsmodels.regression.linear_model import OLS
-import matplotlib.pyplot as plt
 import logging
 from typing import Tuple, Optional
+from numba_compat import njit, prange, NUMBA_AVAILABLE, SAFE_FASTMATH
+from utils import get_pyplot
 
 logger = logging.getLogger(__name__)
 
 
+# Above this many observations the AIC lag search starts to dominate the
+# cost of the ADF/Engle-Granger tests
+AUTOLAG_WARN_OBS = 10_000
+
+# half_life = _NEG_LOG2 / lambda (Numba freezes it as a compile-time constant)
+_NEG_LOG2 = -math.log(2.0)
+
+# MacKinnon (2010) asymptotic critical values, constant and no trend, for the
+# plain Dickey-Fuller test and for Engle-Granger residuals of two variables
+DF_CRITICAL_VALUES = {0.01: -3.43, 0.05: -2.86, 0.10: -2.57}
+EG_CRITICAL_VALUES = {0.01: -3.90, 0.05: -3.34, 0.10: -3.04}
+
+
+def schwert_maxlag(n_obs: int) -> int:
+    """Schwert's rule of thumb for the ADF lag length: ceil(12 * (n/100)^(1/4))."""
+    return int(np.ceil(12 * (n_obs / 100.0) ** 0.25))
+
+
+# Kernels are compiled eagerly for these signatures at import (and cached to
+# disk), so a one-shot analysis never pays the JIT on its first call. Inputs
+# are typed read-only, which also accepts writable arrays, so pandas'
+# copy-on-write views match without a copy.
+_VECTOR = "Array(float64, 1, 'C', readonly=True)"
+_MATRIX_F = "Array(float64, 2, 'F', readonly=True)"
+_MATRIX_C = "Array(float64, 2, 'C', readonly=True)"
+_MATRIX32_F = "Array(float32, 2, 'F', readonly=True)"
+_MATRIX32_C = "Array(float32, 2, 'C', readonly=True)"
+
+
+@njit(f'float64({_VECTOR})', cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _mean_reversion_lambda_kernel(spread):
+    """
+    Slope of delta(spread) on lagged spread (no intercept), in one pass.
+    
+    Pairs with a non-finite value are skipped, like dropna() would.
+    """
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(1, spread.shape[0]):
+        x = spread[i - 1]
+        y = spread[i] - x
+        if np.isfinite(x) and np.isfinite(y):
+            sxx += x * x
+            sxy += x * y
+    return sxy / sxx
+
+
+def _mean_reversion_lambda_numpy(spread):
+    """NumPy equivalent of _mean_reversion_lambda_kernel."""
+    x = spread[:-1]
+    y = np.diff(spread)
+    
+    # x stays a view on the spread buffer; only gather when there is
+    # something to drop (gaps in the price history)
+    valid = np.isfinite(y)
+    if not valid.all():
+        x = x[valid]
+        y = y[valid]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.dot(x, y) / np.dot(x, x)
+
+
+@njit(f'Tuple((float64, float64[::1], float64, float64, float64))({_VECTOR}, {_VECTOR})',
+      cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _pair_fit_kernel(p1, p2):
+    """
+    Hedge ratio, spread, spread moments and half-life slope in two sweeps.
+    
+    Returns:
+        Tuple of (hedge_ratio, spread, spread_mean, spread_std, lambda_coef);
+        mean/std skip non-finite values and std uses ddof=1, like pandas
+    """
+    n = p1.shape[0]
+    
+    # Sweep 1: OLS slope through the origin
+    sxy_p = 0.0
+    sxx_p = 0.0
+    for i in range(n):
+        sxy_p += p1[i] * p2[i]
+        sxx_p += p2[i] * p2[i]
+    beta = sxy_p / sxx_p
+    
+    # Sweep 2: spread, its moments (Welford) and the lag-1 regression sums
+    spread = np.empty(n)
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(n):
+        s = p1[i] - beta * p2[i]
+        spread[i] = s
+        if np.isfinite(s):
+            count += 1
+            delta = s - mean
+            mean += delta / count
+            m2 += delta * (s - mean)
+        if i > 0:
+            x = spread[i - 1]
+            y = s - x
+            if np.isfinite(x) and np.isfinite(y):
+                sxx += x * x
+                sxy += x * y
+    
+    if count == 0:
+        mean = np.nan
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+    return beta, spread, mean, std, sxy / sxx
+
+
+def _pair_fit_numpy(p1, p2):
+    """NumPy equivalent of _pair_fit_kernel."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.dot(p1, p2) / np.dot(p2, p2)
+    spread = p1 - beta * p2
+    finite = spread[np.isfinite(spread)]
+    mean = finite.mean() if finite.size else np.nan
+    std = finite.std(ddof=1) if finite.size > 1 else np.nan
+    return beta, spread, mean, std, _mean_reversion_lambda_numpy(spread)
+
+
+@njit(f'float64({_VECTOR})', cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _df_tau_kernel(u):
+    """
+    Dickey-Fuller tau of delta(u) = alpha + gamma * u_lag (no lagged differences).
+    
+    Two passes (means, then centred sums) to avoid cancellation on series
+    far from zero. Pairs with a non-finite value are skipped.
+    """
+    n = 0
+    mx = 0.0
+    my = 0.0
+    for i in range(1, u.shape[0]):
+        x = u[i - 1]
+        y = u[i] - x
+        if np.isfinite(x) and np.isfinite(y):
+            n += 1
+            mx += x
+            my += y
+    mx /= n
+    my /= n
+    
+    sxx = 0.0
+    sxy = 0.0
+    syy = 0.0
+    for i in range(1, u.shape[0]):
+        x = u[i - 1]
+        y = u[i] - x
+        if np.isfinite(x) and np.isfinite(y):
+            dx = x - mx
+            dy = y - my
+            sxx += dx * dx
+            sxy += dx * dy
+            syy += dy * dy
+    
+    gamma = sxy / sxx
+    s2 = (syy - gamma * sxy) / (n - 2)
+    return gamma / np.sqrt(s2 / sxx)
+
+
+def _df_tau_numpy(u):
+    """NumPy equivalent of _df_tau_kernel."""
+    x = u[:-1]
+    y = np.diff(u)
+    valid = np.isfinite(y)
+    if not valid.all():
+        x = x[valid]
+        y = y[valid]
+    x = x - x.mean()
+    y = y - y.mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = np.dot(x, x)
+        sxy = np.dot(x, y)
+        gamma = sxy / sxx
+        s2 = (np.dot(y, y) - gamma * sxy) / (x.size - 2)
+        return gamma / np.sqrt(s2 / sxx)
+
+
+@njit([f'UniTuple(float64[::1], 2)({_MATRIX_F})',
+       f'UniTuple(float64[::1], 2)({_MATRIX_C})',
+       f'UniTuple(float64[::1], 2)({_MATRIX32_F})',
+       f'UniTuple(float64[::1], 2)({_MATRIX32_C})'],
+      parallel=True, cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _screen_pairs_kernel(prices):
+    """
+    Hedge ratio and half-life for every column pair (i < j) of a price matrix.
+    
+    Column i is regressed on column j. Pairs are numbered in row-major
+    upper-triangular order and spread across threads; each one is two
+    sweeps over its columns with no temporary arrays. float32 input halves
+    the memory traffic; the sums are still accumulated in float64.
+    
+    Args:
+        prices: 2-D float64 or float32 array (observations x symbols) without
+            gaps, ideally Fortran-ordered so columns are contiguous
+    
+    Returns:
+        Tuple of (hedge_ratios, half_lives), one entry per pair
+    """
+    n_obs, n_sym = prices.shape
+    num_pairs = n_sym * (n_sym - 1) // 2
+    betas = np.empty(num_pairs)
+    half_lives = np.empty(num_pairs)
+    
+    for k in prange(num_pairs):
+        # Decode k -> (i, j) from the triangular numbering
+        i = n_sym - 2 - int(np.floor(np.sqrt(-8.0 * k + 4.0 * n_sym * (n_sym - 1) - 7.0) / 2.0 - 0.5))
+        j = k + i + 1 - n_sym * (n_sym - 1) // 2 + (n_sym - i) * (n_sym - i - 1) // 2
+        
+        sxy_p = 0.0
+        sxx_p = 0.0
+        for t in range(n_obs):
+            sxy_p += prices[t, i] * prices[t, j]
+            sxx_p += prices[t, j] * prices[t, j]
+        beta = sxy_p / sxx_p
+        
+        sxx = 0.0
+        sxy = 0.0
+        prev = prices[0, i] - beta * prices[0, j]
+        for t in range(1, n_obs):
+            cur = prices[t, i] - beta * prices[t, j]
+            sxx += prev * prev
+            sxy += prev * (cur - prev)
+            prev = cur
+        lambda_coef = sxy / sxx
+        
+        betas[k] = beta
+        half_lives[k] = _NEG_LOG2 / lambda_coef if lambda_coef < 0 else np.inf
+    
+    return betas, half_lives
+
+
+if NUMBA_AVAILABLE:
+    _mean_reversion_lambda = _mean_reversion_lambda_kernel
+    _pair_fit = _pair_fit_kernel
+    _df_tau = _df_tau_kernel
+else:
+    _mean_reversion_lambda = _mean_reversion_lambda_numpy
+    _pair_fit = _pair_fit_numpy
+    _df_tau = _df_tau_numpy
+
+
 class CointegrationAnalyzer:
     """
     Analyzes cointegration between two price series.
@@ -36,12 +279,25 @@ class CointegrationAnalyzer:
             symbol1: Name of first symbol
             symbol2: Name of second symbol
         """
-        self.prices1 = prices1.squeeze() if isinstance(prices1, pd.DataFrame) else prices1
-        self.prices2 = prices2.squeeze() if isinstance(prices2, pd.DataFrame) else prices2
+        self.prices1 = prices1
+        self.prices2 = prices2
         self.symbol1 = symbol1
         self.symbol2 = symbol2
         self.hedge_ratio = None
-        self.spread = None
+        self._spread = None
+        self._spread_values = None
+    
+    @property
+    def spread(self) -> Optional[pd.Series]:
+        """Spread as a Series, wrapped on first access when only the array is held."""
+        if self._spread is None and self._spread_values is not None:
+            self._spread = pd.Series(self._spread_values, index=self.prices1.index)
+        return self._spread
+    
+    @spread.setter
+    def spread(self, value: Optional[pd.Series]):
+        self._spread = value
+        self._spread_values = None
         
     def calculate_hedge_ratio(self) -> float:
         """
@@ -56,12 +312,11 @@ class CointegrationAnalyzer:
         # Perform regression: prices1 = alpha + beta * prices2
         # We want to find beta (hedge ratio)
         
-        X = self.prices2.values.reshape(-1, 1)
-        y = self.prices1.values
+        x = np.asarray(self.prices2.values, dtype=np.float64)
+        y = np.asarray(self.prices1.values, dtype=np.float64)
         
-        # Use OLS regression
-        model = OLS(y, X).fit()
-        self.hedge_ratio = model.params[0]
+        # Closed-form OLS slope through the origin: sum(x*y) / sum(x*x)
+        self.hedge_ratio = float(np.dot(x, y) / np.dot(x, x))
         
         logger.info(f"Calculated hedge ratio: {self.hedge_ratio:.4f}")
         logger.info(f"Interpretation: 1 unit of {self.symbol1} = "
@@ -81,6 +336,26 @@ class CointegrationAnalyzer:
         Returns:
             Spread series
         """
+        self.calculate_spread_array(hedge_ratio)
+        
+        logger.info(f"Spread mean: {self.spread.mean():.4f}, "
+                   f"std: {self.spread.std():.4f}")
+        
+        return self.spread
+    
+    def calculate_spread_array(self, hedge_ratio: Optional[float] = None) -> np.ndarray:
+        """
+        Calculate the spread as a plain float64 array.
+        
+        Same as calculate_spread, minus the Series construction and logging,
+        for screening loops; `spread` is only wrapped as a Series if accessed.
+        
+        Args:
+            hedge_ratio: Hedge ratio to use (if None, calculate it)
+        
+        Returns:
+            Spread array
+        """
         if hedge_ratio is None:
             if self.hedge_ratio is None:
                 hedge_ratio = self.calculate_hedge_ratio()
@@ -89,24 +364,33 @@ class CointegrationAnalyzer:
         else:
             self.hedge_ratio = hedge_ratio
         
-        self.spread = self.prices1 - hedge_ratio * self.prices2
-        
-        logger.info(f"Spread mean: {self.spread.mean():.4f}, "
-                   f"std: {self.spread.std():.4f}")
-        
-        return self.spread
+        self._spread = None
+        self._spread_values = self._spread_arr(hedge_ratio)
+        return self._spread_values
+    
+    def _spread_arr(self, hedge_ratio: float) -> np.ndarray:
+        """prices1 - hedge_ratio * prices2 on the underlying arrays."""
+        p1 = np.asarray(self.prices1, dtype=np.float64)
+        p2 = np.asarray(self.prices2, dtype=np.float64)
+        return p1 - hedge_ratio * p2
     
     def test_stationarity(self, series: Optional[pd.Series] = None, 
-                         confidence_level: float = 0.05) -> Tuple[bool, float, dict]:
+                         confidence_level: float = 0.05,
+                         lags: Optional[int] = None) -> Tuple[bool, float, dict]:
         """
         Test if a series is stationary using Augmented Dickey-Fuller test.
         
         From Chan's Chapter 7: A spread must be stationary (mean-reverting)
         for pairs trading to work.
         
+        By default the lag length is chosen by AIC, which refits the
+        regression for every candidate lag. On long series pass a fixed
+        `lags` (e.g. schwert_maxlag(len(series))) to skip that search.
+        
         Args:
             series: Time series to test (if None, use the spread)
             confidence_level: Significance level (default 0.05 for 95% confidence)
+            lags: Fixed number of lagged differences (default: AIC search)
         
         Returns:
             Tuple of (is_stationary, p_value, adf_results)
@@ -117,7 +401,13 @@ class CointegrationAnalyzer:
             series = self.spread
         
         # Perform ADF test
-        adf_result = adfuller(series, autolag='AIC')
+        if lags is None:
+            if len(series) > AUTOLAG_WARN_OBS:
+                logger.warning(f"ADF lag search on {len(series)} observations is slow; "
+                               f"pass lags= to use a fixed lag length")
+            adf_result = adfuller(series, autolag='AIC')
+        else:
+            adf_result = adfuller(series, maxlag=lags, autolag=None, regression='c')
         
         adf_statistic = adf_result[0]
         p_value = adf_result[1]
@@ -148,7 +438,48 @@ class CointegrationAnalyzer:
         
         return is_stationary, p_value, results
     
-    def test_cointegration(self, confidence_level: float = 0.05) -> Tuple[bool, float]:
+    def fast_test_stationarity(self, series: Optional[pd.Series] = None,
+                               confidence_level: float = 0.05,
+                               precise: bool = False) -> Tuple[bool, float]:
+        """
+        Dickey-Fuller test without lagged differences, for screening loops.
+        
+        Computes tau from a single compiled regression and compares it to
+        tabulated MacKinnon critical values instead of going through
+        statsmodels. With precise=True the same test runs through adfuller.
+        
+        Args:
+            series: Time series to test (if None, use the spread)
+            confidence_level: Significance level (0.01, 0.05 or 0.10)
+            precise: Use statsmodels instead of the compiled kernel
+        
+        Returns:
+            Tuple of (is_stationary, tau)
+        """
+        if confidence_level not in DF_CRITICAL_VALUES:
+            raise ValueError(f"confidence_level must be one of {sorted(DF_CRITICAL_VALUES)}")
+        
+        if series is None:
+            if self.spread is None:
+                self.calculate_spread()
+            series = self.spread
+        
+        if precise:
+            is_stationary, _, adf_results = self.test_stationarity(series, confidence_level, lags=0)
+            return is_stationary, adf_results['adf_statistic']
+        
+        values = np.ascontiguousarray(np.asarray(series, dtype=np.float64))
+        tau = float(_df_tau(values))
+        critical_value = DF_CRITICAL_VALUES[confidence_level]
+        is_stationary = tau < critical_value
+        
+        logger.debug(f"DF tau {tau:.4f} vs critical value {critical_value} "
+                     f"({confidence_level:.0%}): {'stationary' if is_stationary else 'not stationary'}")
+        
+        return is_stationary, tau
+    
+    def test_cointegration(self, confidence_level: float = 0.05,
+                           lags: Optional[int] = None) -> Tuple[bool, float]:
         """
         Test if the two price series are cointegrated.
         
@@ -156,12 +487,19 @@ class CointegrationAnalyzer:
         
         Args:
             confidence_level: Significance level (default 0.05)
+            lags: Fixed lag length of the residual ADF test (default: AIC search)
         
         Returns:
             Tuple of (is_cointegrated, p_value)
         """
         # Perform Engle-Granger cointegration test
-        score, p_value, _ = coint(self.prices1, self.prices2)
+        if lags is None:
+            if len(self.prices1) > AUTOLAG_WARN_OBS:
+                logger.warning(f"Cointegration lag search on {len(self.prices1)} observations "
+                               f"is slow; pass lags= to use a fixed lag length")
+            score, p_value, _ = coint(self.prices1, self.prices2)
+        else:
+            score, p_value, _ = coint(self.prices1, self.prices2, maxlag=lags, autolag=None)
         
         is_cointegrated = p_value < confidence_level
         
@@ -197,29 +535,18 @@ class CointegrationAnalyzer:
                 self.calculate_spread()
             spread = self.spread
         
-        # Calculate lagged spread
-        spread_lag = spread.shift(1)
-        spread_lag = spread_lag.dropna()
-        
-        # Calculate change in spread
-        spread_delta = spread - spread_lag
-        spread_delta = spread_delta.dropna()
-        
-        # Align the series
-        common_idx = spread_lag.index.intersection(spread_delta.index)
-        spread_lag = spread_lag.loc[common_idx]
-        spread_delta = spread_delta.loc[common_idx]
-        
         # Regression: delta(spread) = lambda * spread_lag + error
         # lambda = -log(2) / half_life
-        model = OLS(spread_delta.values, spread_lag.values).fit()
-        lambda_coef = model.params[0]
-        
+        values = np.ascontiguousarray(np.asarray(spread, dtype=np.float64))
+        return self._half_life_from_lambda(_mean_reversion_lambda(values))
+    
+    def _half_life_from_lambda(self, lambda_coef: float) -> float:
+        """Convert the mean-reversion speed to a half-life and log how tradeable it is."""
         if lambda_coef >= 0:
             logger.warning("Spread is not mean-reverting (lambda >= 0)")
             return np.inf
         
-        half_life = -np.log(2) / lambda_coef
+        half_life = _NEG_LOG2 / lambda_coef
         
         logger.info(f"Half-life of mean reversion: {half_life:.2f} days")
         
@@ -238,9 +565,16 @@ class CointegrationAnalyzer:
         """
         Create comprehensive visualization of cointegration analysis.
         """
+        # Loaded here so analysis-only runs (e.g. pair sweeps) skip matplotlib
+        plt = get_pyplot()
+        
         if self.spread is None:
             self.calculate_spread()
         
+        # Spread statistics, reduced once and reused by the bands and z-score
+        spread_mean = self.spread.mean()
+        spread_std = self.spread.std()
+        
         fig, axes = plt.subplots(3, 1, figsize=(14, 12))
         
         # Plot 1: Both price series (normalized)
@@ -259,11 +593,11 @@ class CointegrationAnalyzer:
         # Plot 2: Spread
         axes[1].plot(self.spread.index, self.spread.values, 
                     linewidth=1.5, color='green')
-        axes[1].axhline(y=self.spread.mean(), color='red', linestyle='--', 
+        axes[1].axhline(y=spread_mean, color='red', linestyle='--', 
                        label='Mean', linewidth=2)
-        axes[1].axhline(y=self.spread.mean() + 2*self.spread.std(), 
+        axes[1].axhline(y=spread_mean + 2*spread_std, 
                        color='orange', linestyle='--', label='±2σ', alpha=0.7)
-        axes[1].axhline(y=self.spread.mean() - 2*self.spread.std(), 
+        axes[1].axhline(y=spread_mean - 2*spread_std, 
                        color='orange', linestyle='--', alpha=0.7)
         axes[1].set_title(f'Spread ({self.symbol1} - {self.hedge_ratio:.4f} × {self.symbol2})', 
                          fontsize=14, fontweight='bold')
@@ -272,7 +606,7 @@ class CointegrationAnalyzer:
         axes[1].grid(True, alpha=0.3)
         
         # Plot 3: Z-score of spread
-        zscore = (self.spread - self.spread.mean()) / self.spread.std()
+        zscore = (self.spread - spread_mean) / spread_std
         axes[2].plot(zscore.index, zscore.values, linewidth=1.5, color='blue')
         axes[2].axhline(y=0, color='black', linestyle='-', alpha=0.5)
         axes[2].axhline(y=2, color='red', linestyle='--', label='Entry Threshold (±2σ)')
@@ -300,23 +634,36 @@ class CointegrationAnalyzer:
         logger.info(f"COINTEGRATION ANALYSIS: {self.symbol1} vs {self.symbol2}")
         logger.info("="*60)
         
-        # Calculate hedge ratio and spread
-        hedge_ratio = self.calculate_hedge_ratio()
-        spread = self.calculate_spread()
+        # Hedge ratio, spread, its moments and the half-life regression in one
+        # fused pass over the two price arrays
+        p1 = np.ascontiguousarray(np.asarray(self.prices1, dtype=np.float64))
+        p2 = np.ascontiguousarray(np.asarray(self.prices2, dtype=np.float64))
+        hedge_ratio, spread_values, spread_mean, spread_std, lambda_coef = _pair_fit(p1, p2)
+        
+        # The spread Series is only built if something (e.g. plot_analysis)
+        # asks for it afterwards
+        self.hedge_ratio = hedge_ratio = float(hedge_ratio)
+        self._spread = None
+        self._spread_values = spread_values
+        
+        logger.info(f"Calculated hedge ratio: {hedge_ratio:.4f}")
+        logger.info(f"Interpretation: 1 unit of {self.symbol1} = "
+                   f"{hedge_ratio:.4f} units of {self.symbol2}")
+        logger.info(f"Spread mean: {spread_mean:.4f}, std: {spread_std:.4f}")
         
         # Test cointegration
         is_cointegrated, coint_pvalue = self.test_cointegration()
         
         # Test stationarity of spread
-        is_stationary, adf_pvalue, adf_results = self.test_stationarity()
+        is_stationary, adf_pvalue, adf_results = self.test_stationarity(spread_values)
         
         # Calculate half-life
-        half_life = self.calculate_half_life()
+        half_life = self._half_life_from_lambda(lambda_coef)
         
         results = {
             'hedge_ratio': hedge_ratio,
-            'spread_mean': spread.mean(),
-            'spread_std': spread.std(),
+            'spread_mean': spread_mean,
+            'spread_std': spread_std,
             'is_cointegrated': is_cointegrated,
             'cointegration_pvalue': coint_pvalue,
             'is_stationary': is_stationary,
@@ -345,8 +692,85 @@ class CointegrationAnalyzer:
         return results
 
 
+def screen_pairs(prices: pd.DataFrame, min_half_life: float = 1.0,
+                 max_half_life: float = 60.0, confidence_level: float = 0.05,
+                 lags: Optional[int] = None, precise: bool = True,
+                 single_precision: bool = True) -> pd.DataFrame:
+    """
+    Screen every pair of columns for cointegration.
+    
+    Hedge ratios and half-lives for all pairs are computed in parallel
+    first; only pairs whose half-life falls in [min_half_life,
+    max_half_life] go on to the (much slower) Engle-Granger test.
+    
+    With precise=False the survivors are instead judged by the compiled
+    Dickey-Fuller tau of their spread against the Engle-Granger critical
+    values; no p-value is computed and `lags` is ignored.
+    
+    Args:
+        prices: Close prices, one column per symbol (rows with gaps are dropped)
+        min_half_life: Shortest half-life (in bars) worth testing
+        max_half_life: Longest half-life (in bars) worth testing
+        confidence_level: Significance level of the cointegration test
+        lags: Fixed lag length of the residual ADF test (default: AIC search)
+        precise: Run the statsmodels Engle-Granger test on the survivors
+        single_precision: Run the all-pairs pass on a float32 copy of the
+            prices (hedge ratios/half-lives agree to ~1e-6 relative); the
+            tests on the survivors always use float64
+    
+    Returns:
+        DataFrame of the surviving pairs (symbol1, symbol2, hedge_ratio,
+        half_life, statistic, p_value, is_cointegrated), sorted by p-value
+        (or by statistic when precise=False)
+    """
+    if not precise and confidence_level not in EG_CRITICAL_VALUES:
+        raise ValueError(f"confidence_level must be one of {sorted(EG_CRITICAL_VALUES)}")
+    
+    prices = prices.dropna()
+    symbols = list(prices.columns)
+    matrix = np.asfortranarray(prices.to_numpy(dtype=np.float64))
+    n_sym = len(symbols)
+    
+    screen_matrix = matrix.astype(np.float32, order='F') if single_precision else matrix
+    betas, half_lives = _screen_pairs_kernel(screen_matrix)
+    
+    pairs = [(i, j) for i in range(n_sym) for j in range(i + 1, n_sym)]
+    survivors = np.flatnonzero((half_lives >= min_half_life) & (half_lives <= max_half_life))
+    logger.info(f"Screened {len(pairs)} pairs: {len(survivors)} with half-life in "
+                f"[{min_half_life}, {max_half_life}] go to the cointegration test")
+    
+    rows = []
+    for k in survivors:
+        i, j = pairs[k]
+        if not precise:
+            statistic = float(_df_tau(matrix[:, i] - betas[k] * matrix[:, j]))
+            p_value = np.nan
+            is_cointegrated = statistic < EG_CRITICAL_VALUES[confidence_level]
+        else:
+            if lags is None:
+                statistic, p_value, _ = coint(matrix[:, i], matrix[:, j])
+            else:
+                statistic, p_value, _ = coint(matrix[:, i], matrix[:, j], maxlag=lags, autolag=None)
+            is_cointegrated = p_value < confidence_level
+        rows.append({
+            'symbol1': symbols[i],
+            'symbol2': symbols[j],
+            'hedge_ratio': betas[k],
+            'half_life': half_lives[k],
+            'statistic': statistic,
+            'p_value': p_value,
+            'is_cointegrated': is_cointegrated,
+        })
+    
+    columns = ['symbol1', 'symbol2', 'hedge_ratio', 'half_life', 'statistic', 'p_value',
+               'is_cointegrated']
+    sort_key = 'p_value' if precise else 'statistic'
+    return pd.DataFrame(rows, columns=columns).sort_values(sort_key, ignore_index=True)
+
+
 if __name__ == "__main__":
     # Test the cointegration analyzer
+    plt = get_pyplot()
     from data_fetcher import DataFetcher
     
     logging.basicConfig(level=logging.INFO, 
@@ -361,8 +785,8 @@ if __name__ == "__main__":
     data1, data2 = fetcher.fetch_data(start_date='2018-01-01')
     
     # Use only training period for analysis (first 252 days)
-    train_data1 = data1.iloc[:252]['close']
-    train_data2 = data2.iloc[:252]['close']
+    train_data1 = data1.iloc[:252]
+    train_data2 = data2.iloc[:252]
     
     # Analyze cointegration
     analyzer = CointegrationAnalyzer(train_data1, train_data2, 'GLD', 'GDX')
@@ -8,12 +8,32 @@ Downloads and manages historical price data for trading pairs.
 import pandas as pd
 import numpy as np
 import yfinance as yf
+import hashlib
+import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Parquet needs pyarrow; without it the on-disk price cache is disabled
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# bottleneck's C moving-window kernels; pandas rolling is the fallback
+try:
+    import bottleneck as bn
+    BOTTLENECK_AVAILABLE = True
+except ImportError:
+    BOTTLENECK_AVAILABLE = False
+
+DEFAULT_CACHE_DIR = Path('.cache/prices')
+CACHE_TTL_SECONDS = 24 * 3600  # Closed ranges only; see _cache_path
+
 
 class DataFetcher:
     """
@@ -23,21 +43,73 @@ class DataFetcher:
     Always use adjusted close prices to account for splits and dividends.
     """
     
-    def __init__(self, symbol1: str, symbol2: str):
+    def __init__(self, symbol1: str, symbol2: str,
+                 cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
         """
         Initialize DataFetcher.
         
         Args:
             symbol1: First symbol (e.g., 'GLD')
             symbol2: Second symbol (e.g., 'GDX')
+            cache_dir: Directory for cached downloads (None disables the cache)
         """
         self.symbol1 = symbol1
         self.symbol2 = symbol2
         self.data1 = None
         self.data2 = None
+        self.cache_dir = Path(cache_dir) if cache_dir is not None and PARQUET_AVAILABLE else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _cache_path(self, start_date: str, end_date: Optional[str]) -> Optional[Path]:
+        """
+        Parquet file holding the aligned closes for this pair and window.
+        
+        Only closed historical ranges are cached. An open-ended request
+        (end_date None, today or later) still gains bars during the day, so
+        serving it from disk would hand live signals stale prices.
+        """
+        if self.cache_dir is None:
+            return None
+        if end_date is None or pd.Timestamp(end_date).normalize() >= pd.Timestamp.now().normalize():
+            return None
+        raw = f"{self.symbol1}|{self.symbol2}|{start_date}|{end_date}|1d"
+        key = hashlib.sha256(raw.encode()).hexdigest()[:16]
+        return self.cache_dir / f"{key}.parquet"
+    
+    def _load_cached_closes(self, path: Optional[Path]) -> Optional[pd.DataFrame]:
+        """Return the cached closes if present and younger than CACHE_TTL_SECONDS."""
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime < CACHE_TTL_SECONDS:
+                closes = pd.read_parquet(path)
+                self.cache_hits += 1
+                logger.debug(f"Price cache hit: {path.name} "
+                             f"(hits={self.cache_hits}, misses={self.cache_misses})")
+                return closes
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable price cache {path}: {e}")
+        
+        self.cache_misses += 1
+        logger.debug(f"Price cache miss: {path.name} "
+                     f"(hits={self.cache_hits}, misses={self.cache_misses})")
+        return None
+    
+    def _store_cached_closes(self, path: Optional[Path], closes: pd.DataFrame):
+        """Persist the aligned closes; a failed write only costs the next run a download."""
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            closes.to_parquet(path, compression='zstd')
+        except Exception as e:
+            logger.warning(f"Could not write price cache {path}: {e}")
         
     def fetch_data(self, start_date: str, end_date: Optional[str] = None,
-                   min_history_days: int = 500) -> Tuple[pd.DataFrame, pd.DataFrame]:
+                   min_history_days: int = 500) -> Tuple[pd.Series, pd.Series]:
         """
         Fetch historical data for both symbols from Yahoo Finance.
         
@@ -47,54 +119,40 @@ class DataFetcher:
             min_history_days: Minimum number of trading days required
         
         Returns:
-            Tuple of (data1, data2) as DataFrames with adjusted close prices
+            Tuple of (data1, data2) as Series of adjusted close prices (named 'close')
         """
         logger.info(f"Fetching data for {self.symbol1} and {self.symbol2}")
         logger.info(f"Date range: {start_date} to {end_date or 'present'}")
         
         try:
-            # Download data
-            data1 = yf.download(self.symbol1, start=start_date, end=end_date, 
-                               progress=False)
-            data2 = yf.download(self.symbol2, start=start_date, end=end_date, 
-                               progress=False)
+            cache_path = self._cache_path(start_date, end_date)
+            closes = self._load_cached_closes(cache_path)
             
-            # Extract adjusted close prices
-            if 'Adj Close' in data1.columns:
-                prices1 = pd.DataFrame(data1['Adj Close'])
-                prices1.columns = ['close']
-            else:
-                prices1 = pd.DataFrame(data1['Close'])
-                prices1.columns = ['close']
+            if closes is None:
+                # Download both symbols in one request; with auto_adjust the
+                # 'Close' column is already split/dividend adjusted
+                data = yf.download([self.symbol1, self.symbol2], start=start_date, end=end_date,
+                                   progress=False, group_by='ticker', auto_adjust=True,
+                                   threads=True)
                 
-            if 'Adj Close' in data2.columns:
-                prices2 = pd.DataFrame(data2['Adj Close'])
-                prices2.columns = ['close']
-            else:
-                prices2 = pd.DataFrame(data2['Close'])
-                prices2.columns = ['close']
-            
-            # Align the data (get common trading days)
-            common_dates = prices1.index.intersection(prices2.index)
-            common_dates = common_dates.sort_values()
+                # The joint frame shares one sorted index, so selecting the close
+                # columns needs no join and dropping rows where either symbol is
+                # missing leaves the common trading days
+                closes = data.xs('Close', axis=1, level=1)[[self.symbol1, self.symbol2]]
+                closes = closes.dropna(how='any')
+                if not closes.index.is_monotonic_increasing:
+                    closes = closes.sort_index()
+                
+                self._store_cached_closes(cache_path, closes)
             
-            prices1 = prices1.loc[common_dates]
-            prices2 = prices2.loc[common_dates]
+            prices1 = closes[self.symbol1].rename('close')
+            prices2 = closes[self.symbol2].rename('close')
             
             # Check if we have enough data
             if len(prices1) < min_history_days:
                 logger.warning(f"Only {len(prices1)} days of data available. "
                              f"Minimum recommended: {min_history_days}")
             
-            # Remove any NaN values
-            prices1 = prices1.dropna()
-            prices2 = prices2.dropna()
-            
-            # Final alignment
-            common_dates = prices1.index.intersection(prices2.index)
-            prices1 = prices1.loc[common_dates]
-            prices2 = prices2.loc[common_dates]
-            
             logger.info(f"Successfully fetched {len(prices1)} days of aligned data")
             logger.info(f"Date range: {prices1.index[0]} to {prices1.index[-1]}")
             
@@ -108,8 +166,8 @@ class DataFetcher:
             raise
     
     def split_train_test(self, train_pct: float = 0.67, 
-                        train_days: Optional[int] = None) -> Tuple[Tuple[pd.DataFrame, pd.DataFrame],
-                                                                    Tuple[pd.DataFrame, pd.DataFrame]]:
+                        train_days: Optional[int] = None) -> Tuple[Tuple[pd.Series, pd.Series],
+                                                                    Tuple[pd.Series, pd.Series]]:
         """
         Split data into training and testing sets.
         
@@ -157,8 +215,8 @@ class DataFetcher:
         if self.data1 is None or self.data2 is None:
             raise ValueError("No data available. Call fetch_data() first.")
         
-        price1 = self.data1['close'].iloc[-1]
-        price2 = self.data2['close'].iloc[-1]
+        price1 = self.data1.iloc[-1]
+        price2 = self.data2.iloc[-1]
         
         return price1, price2
     
@@ -167,19 +225,35 @@ class DataFetcher:
         Add common technical indicators to the data.
         
         Args:
-            data: DataFrame with 'close' column
+            data: Close price Series (as returned by fetch_data) or DataFrame
+                with a 'close' column
         
         Returns:
             DataFrame with additional indicator columns
         """
-        df = data.copy()
+        df = data.to_frame('close') if isinstance(data, pd.Series) else data.copy()
+        
+        if not BOTTLENECK_AVAILABLE:
+            # Simple moving averages
+            df['sma_20'] = df['close'].rolling(window=20).mean()
+            df['sma_50'] = df['close'].rolling(window=50).mean()
+            
+            # Volatility (20-day rolling standard deviation)
+            df['volatility'] = df['close'].pct_change().rolling(window=20).std()
+            return df
+        
+        close = df['close'].to_numpy(dtype=np.float64)
         
         # Simple moving averages
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['sma_50'] = df['close'].rolling(window=50).mean()
+        df['sma_20'] = bn.move_mean(close, window=20, min_count=20)
+        df['sma_50'] = bn.move_mean(close, window=50, min_count=50)
         
-        # Volatility (20-day rolling standard deviation)
-        df['volatility'] = df['close'].pct_change().rolling(window=20).std()
+        # Volatility (20-day rolling standard deviation of simple returns)
+        returns = np.empty_like(close)
+        returns[:1] = np.nan
+        np.divide(close[1:], close[:-1], out=returns[1:])
+        returns[1:] -= 1.0
+        df['volatility'] = bn.move_std(returns, window=20, min_count=20, ddof=1)
         
         return df
 
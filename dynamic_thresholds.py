@@ -13,11 +13,270 @@ This prevents false signals during choppy markets and catches real opportunities
 
 import numpy as np
 import pandas as pd
-from typing import Tuple
+from collections import deque
+from typing import Tuple, Union
 import logging
+from numba_compat import njit, NUMBA_AVAILABLE, SAFE_FASTMATH
 
 logger = logging.getLogger(__name__)
 
+# Threshold multipliers, indexed by regime so the scalar and vectorized
+# paths pick them without branching:
+#   entry: 0 = low vol (ratio < 0.7), 1 = normal (also NaN), 2 = high (ratio > 1.3)
+#   exit:  0 = slow reversion, 1 = fast reversion (speed > 0.5)
+ENTRY_MULTIPLIERS = np.array([1.0, 1.2, 1.5])
+EXIT_MULTIPLIERS = np.array([1.2, 0.8])
+_VOL_REGIMES = ("Low volatility environment - tighter thresholds",
+                "Normal volatility environment",
+                "High volatility environment - wider thresholds")
+_REVERSION_REGIMES = ("Slow reversion - patient exits",
+                      "Fast reversion - earlier exits")
+
+
+# Scales the MAD to the standard deviation for normal data (Iglewicz & Hoaglin)
+MODIFIED_ZSCORE_SCALE = 0.6745
+
+
+def _median(values: np.ndarray) -> float:
+    """Median via an O(n) partition around the middle element(s)."""
+    n = values.size
+    if n == 0:
+        return np.nan
+    lo, hi = (n - 1) // 2, n // 2
+    middle = np.partition(values, (lo, hi))
+    return 0.5 * (middle[lo] + middle[hi])
+
+
+def _vol_regime(vol_ratio):
+    """Index into ENTRY_MULTIPLIERS for a scalar or array volatility ratio."""
+    return 1 - np.less(vol_ratio, 0.7).astype(np.int8) + np.greater(vol_ratio, 1.3).astype(np.int8)
+
+
+# Compiled eagerly at import (and cached to disk); read-only inputs also
+# accept writable arrays
+_VECTOR = "Array(float64, 1, 'C', readonly=True)"
+_VECTOR32 = "Array(float32, 1, 'C', readonly=True)"
+
+
+@njit(f'Tuple((int64, float64))({_VECTOR}, int64)',
+      cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _trailing_return_std_kernel(values, window):
+    """
+    Sample std of the last `window` simple returns, scanning backwards.
+    
+    NaN returns are skipped, like pct_change().dropna(). Stops as soon as
+    `window` returns are collected, so the cost is O(window), not O(len).
+    
+    Returns:
+        Tuple of (returns_seen, std); returns_seen < window means the
+        series ran out and std covers all of its returns
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(values.shape[0] - 1, 0, -1):
+        if count == window:
+            break
+        r = values[i] / values[i - 1] - 1.0
+        if np.isnan(r):
+            continue
+        count += 1
+        delta = r - mean
+        mean += delta / count
+        m2 += delta * (r - mean)
+    
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+    return count, std
+
+
+def _trailing_return_std_numpy(values, window):
+    """NumPy equivalent of _trailing_return_std_kernel."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1.0
+        returns = returns[~np.isnan(returns)][-window:] if window > 0 else returns[:0]
+        std = returns.std(ddof=1) if returns.size > 1 else np.nan
+    return returns.size, std
+
+
+@njit(f'float64({_VECTOR})', cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _reversion_speed_kernel(z):
+    """
+    Zero-crossing rate and lag-1 autocorrelation of z, combined into a speed score.
+    
+    The autocorrelation is Pearson over neighbour pairs with no NaN, the
+    same pairs Series.autocorr(lag=1) uses.
+    """
+    n = z.shape[0]
+    crossings = 0
+    pairs = 0
+    mx = 0.0
+    my = 0.0
+    for i in range(1, n):
+        x = z[i - 1]
+        y = z[i]
+        if x * y < 0:
+            crossings += 1
+        if not (np.isnan(x) or np.isnan(y)):
+            pairs += 1
+            mx += x
+            my += y
+    
+    autocorr = np.nan
+    if pairs > 0:
+        mx /= pairs
+        my /= pairs
+        sxx = 0.0
+        syy = 0.0
+        sxy = 0.0
+        for i in range(1, n):
+            x = z[i - 1]
+            y = z[i]
+            if not (np.isnan(x) or np.isnan(y)):
+                sxx += (x - mx) * (x - mx)
+                syy += (y - my) * (y - my)
+                sxy += (x - mx) * (y - my)
+        denom = sxx * syy
+        if denom > 0:
+            autocorr = sxy / np.sqrt(denom)
+    
+    reversion_rate = crossings / n
+    if autocorr < 0:
+        return min(1.0, reversion_rate * 2 + abs(autocorr))
+    return reversion_rate
+
+
+def _reversion_speed_numpy(z):
+    """NumPy equivalent of _reversion_speed_kernel."""
+    x = z[:-1]
+    y = z[1:]
+    zero_crossings = np.count_nonzero(x * y < 0)
+    reversion_rate = zero_crossings / len(z)
+    
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.all():
+        x = x[valid]
+        y = y[valid]
+    
+    # Pearson correlation of the neighbour pairs from centred dot products;
+    # a constant window has no defined correlation
+    autocorr = np.nan
+    if x.size > 0:
+        x = x - x.mean()
+        y = y - y.mean()
+        denom = np.dot(x, x) * np.dot(y, y)
+        if denom > 0:
+            autocorr = np.dot(x, y) / np.sqrt(denom)
+    
+    if autocorr < 0:
+        return min(1.0, reversion_rate * 2 + abs(autocorr))
+    return reversion_rate
+
+
+@njit(f'float64[::1]({_VECTOR}, int64)', cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _rolling_reversion_speed_kernel(z, window):
+    """_reversion_speed_kernel over every length-`window` view z[k:k+window]."""
+    n = max(z.shape[0] - window + 1, 0)
+    out = np.empty(n)
+    for k in range(n):
+        out[k] = _reversion_speed_kernel(z[k:k + window])
+    return out
+
+
+def _rolling_reversion_speed_numpy(z, window):
+    """NumPy equivalent of _rolling_reversion_speed_kernel."""
+    n = max(len(z) - window + 1, 0)
+    return np.array([_reversion_speed_numpy(z[k:k + window]) for k in range(n)], dtype=np.float64)
+
+
+_INDEX = "Array(int64, 1, 'C', readonly=True)"
+
+
+@njit([f'float64[::1]({_VECTOR}, {_INDEX}, {_INDEX})',
+       f'float64[::1]({_VECTOR32}, {_INDEX}, {_INDEX})'],
+      cache=True, fastmath=SAFE_FASTMATH, error_model='numpy')
+def _range_std_kernel(values, lo, hi):
+    """
+    Sample std (ddof=1) of values[lo[t]:hi[t]] for every t in O(1) per step.
+    
+    Both bounds must be non-decreasing. Welford's update is applied as each
+    value enters the range and reversed as it leaves. An entry is NaN when
+    the range holds fewer than two values or any inf, as a direct std of
+    the slice would be; infs are kept out of the running state, so the
+    output recovers once they leave. float32 input is accumulated in float64.
+    """
+    out = np.empty(lo.shape[0])
+    count = 0
+    non_finite = 0
+    mean = 0.0
+    m2 = 0.0
+    start = 0
+    stop = 0
+    for t in range(lo.shape[0]):
+        while stop < hi[t]:
+            x = values[stop]
+            stop += 1
+            if not np.isfinite(x):
+                non_finite += 1
+                continue
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        
+        while start < lo[t]:
+            x = values[start]
+            start += 1
+            if not np.isfinite(x):
+                non_finite -= 1
+                continue
+            count -= 1
+            if count == 0:
+                mean = 0.0
+                m2 = 0.0
+            else:
+                delta = x - mean
+                mean -= delta / count
+                m2 -= delta * (x - mean)
+                m2 = max(m2, 0.0)
+        
+        if non_finite == 0 and count > 1:
+            out[t] = np.sqrt(m2 / (count - 1))
+        else:
+            out[t] = np.nan
+    return out
+
+
+def _range_std_numpy(values, lo, hi):
+    """NumPy equivalent of _range_std_kernel, from prefix sums of centred values."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    # Centring on the overall mean keeps the sum-of-squares cancellation small
+    centred = values - values[finite].mean() if finite.any() else values
+    centred = np.where(finite, centred, 0.0)
+    
+    def prefix(x):
+        return np.concatenate(([0], np.cumsum(x)))
+    
+    sums, squares, non_finite = prefix(centred), prefix(centred * centred), prefix(~finite)
+    count = hi - lo
+    total = sums[hi] - sums[lo]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (squares[hi] - squares[lo] - total * total / count) / (count - 1)
+    std = np.sqrt(np.maximum(var, 0.0))
+    return np.where((count > 1) & (non_finite[hi] == non_finite[lo]), std, np.nan)
+
+
+if NUMBA_AVAILABLE:
+    _trailing_return_std = _trailing_return_std_kernel
+    _reversion_speed = _reversion_speed_kernel
+    _range_std = _range_std_kernel
+    _rolling_reversion_speed = _rolling_reversion_speed_kernel
+else:
+    _trailing_return_std = _trailing_return_std_numpy
+    _reversion_speed = _reversion_speed_numpy
+    _range_std = _range_std_numpy
+    _rolling_reversion_speed = _rolling_reversion_speed_numpy
+
 
 class DynamicThresholds:
     """
@@ -28,7 +287,9 @@ class DynamicThresholds:
                  base_entry: float = 2.0,
                  base_exit: float = 1.0,
                  lookback_vol: int = 20,
-                 lookback_reversion: int = 30):
+                 lookback_reversion: int = 30,
+                 stats_window: int = 252,
+                 use_robust: bool = False):
         """
         Initialize dynamic threshold calculator.
         
@@ -37,18 +298,142 @@ class DynamicThresholds:
             base_exit: Base exit threshold (z-score)
             lookback_vol: Window for volatility calculation
             lookback_reversion: Window for reversion speed calculation
+            stats_window: Bars of price history behind update()'s hedge
+                ratio and spread statistics
+            use_robust: calculate_zscore uses the modified z-score
+                (median/MAD), which volatility spikes barely move
         """
-        self.base_entry = base_entry
+        self.base_entry = base_entry  # also sets the entry levels, see below
         self.base_exit = base_exit
         self.lookback_vol = lookback_vol
         self.lookback_reversion = lookback_reversion
+        self.use_robust = use_robust
+        
+        # Rolling pair statistics for update(): the window of (price1, price2)
+        # bars and running sums of x, y, x*x, y*y, x*y (y = price1, x = price2)
+        self.stats_window = stats_window
+        self._bars = deque(maxlen=stats_window)
+        self._sx = self._sy = self._sxx = self._syy = self._sxy = 0.0
+        self._updates_since_refresh = 0
+    
+    # The base thresholds are fixed per configuration, so each one's scaled
+    # levels per regime are computed when it is set; calculate_thresholds
+    # then only indexes a tuple of floats
+    @property
+    def base_entry(self) -> float:
+        return self._base_entry
+    
+    @base_entry.setter
+    def base_entry(self, value: float):
+        self._base_entry = value
+        self._entry_levels = tuple(float(value * m) for m in ENTRY_MULTIPLIERS)
+    
+    @property
+    def base_exit(self) -> float:
+        return self._base_exit
+    
+    @base_exit.setter
+    def base_exit(self, value: float):
+        self._base_exit = value
+        self._exit_levels = tuple(float(value * m) for m in EXIT_MULTIPLIERS)
+    
+    def update(self, new_price1: float, new_price2: float) -> Tuple[float, float, float, float]:
+        """
+        Add one bar and return the rolling hedge ratio and spread statistics.
+        
+        The window's sums are updated in O(1) (add the new bar, drop the one
+        leaving) instead of refitting. Since the spread is linear in the
+        hedge ratio, its mean and variance under the current ratio follow
+        from the same sums. The sums are rebuilt from the window once every
+        stats_window bars so rounding drift cannot accumulate.
         
-    def calculate_realized_volatility(self, spread: pd.Series, window: int = None) -> float:
+        Args:
+            new_price1: Latest price of the first symbol
+            new_price2: Latest price of the second symbol
+            
+        Returns:
+            Tuple of (hedge_ratio, spread_mean, spread_std, zscore) where
+            zscore is that of the new bar; NaN until two bars are in
         """
-        Calculate realized volatility of spread.
+        x = float(new_price2)
+        y = float(new_price1)
+        
+        if len(self._bars) == self.stats_window:
+            old_y, old_x = self._bars[0]
+            self._sx -= old_x
+            self._sy -= old_y
+            self._sxx -= old_x * old_x
+            self._syy -= old_y * old_y
+            self._sxy -= old_x * old_y
+        self._bars.append((y, x))
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._syy += y * y
+        self._sxy += x * y
+        
+        self._updates_since_refresh += 1
+        if self._updates_since_refresh >= self.stats_window:
+            bars = np.array(self._bars)
+            ys, xs = bars[:, 0], bars[:, 1]
+            self._sx, self._sy = xs.sum(), ys.sum()
+            self._sxx, self._syy, self._sxy = np.dot(xs, xs), np.dot(ys, ys), np.dot(xs, ys)
+            self._updates_since_refresh = 0
+        
+        n = len(self._bars)
+        if n < 2 or self._sxx <= 0:
+            return np.nan, np.nan, np.nan, np.nan
+        
+        # Hedge ratio: OLS slope of price1 on price2 through the origin, as in
+        # CointegrationAnalyzer. Spread = y - hedge_ratio * x over the window
+        hedge_ratio = self._sxy / self._sxx
+        spread_sum = self._sy - hedge_ratio * self._sx
+        spread_sq_sum = self._syy - 2 * hedge_ratio * self._sxy + hedge_ratio ** 2 * self._sxx
+        spread_mean = spread_sum / n
+        spread_var = max(spread_sq_sum - n * spread_mean ** 2, 0.0) / (n - 1)
+        spread_std = np.sqrt(spread_var)
+        
+        spread = y - hedge_ratio * x
+        zscore = (spread - spread_mean) / spread_std if spread_std > 0 else np.nan
+        
+        return hedge_ratio, spread_mean, spread_std, zscore
+        
+    def calculate_zscore(self, spread: pd.Series) -> pd.Series:
+        """
+        Z-score of the spread, standard or robust depending on use_robust.
+        
+        The standard score is (x - mean) / std. The modified score is
+        0.6745 * (x - median) / MAD; since a burst of large moves shifts the
+        median and MAD far less than the mean and std, the thresholds
+        derived from it are not widened by the very spikes they react to.
         
         Args:
             spread: Spread series
+            
+        Returns:
+            Z-score series (NaN throughout if the spread has no dispersion)
+        """
+        values = np.asarray(spread, dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        
+        if self.use_robust:
+            center = _median(finite)
+            scale = _median(np.abs(finite - center)) / MODIFIED_ZSCORE_SCALE
+        else:
+            center = finite.mean() if finite.size else np.nan
+            scale = finite.std(ddof=1) if finite.size > 1 else np.nan
+        
+        if not scale > 0:
+            return pd.Series(np.nan, index=spread.index)
+        return (spread - center) / scale
+    
+    def calculate_realized_volatility(self, spread: Union[pd.Series, np.ndarray],
+                                      window: int = None) -> float:
+        """
+        Calculate realized volatility of spread.
+        
+        Args:
+            spread: Spread series (or its float64 values, which are used without a copy)
             window: Lookback window (default: use self.lookback_vol)
             
         Returns:
@@ -57,14 +442,12 @@ class DynamicThresholds:
         if window is None:
             window = self.lookback_vol
         
-        returns = spread.pct_change().dropna()
-        
-        if len(returns) < window:
-            logger.warning(f"Not enough data for volatility calc: {len(returns)} < {window}")
-            return returns.std() if len(returns) > 0 else 0.01
+        values = np.ascontiguousarray(np.asarray(spread, dtype=np.float64))
+        num_returns, realized_vol = _trailing_return_std(values, window)
         
-        # Rolling realized volatility
-        realized_vol = returns.tail(window).std()
+        if num_returns < window:
+            logger.warning(f"Not enough data for volatility calc: {num_returns} < {window}")
+            return realized_vol if num_returns > 0 else 0.01
         
         # Annualize (assuming daily data, 252 trading days)
         annualized_vol = realized_vol * np.sqrt(252)
@@ -95,23 +478,11 @@ class DynamicThresholds:
         if len(recent_zscore) < 10:
             return 0.5  # Default moderate speed
         
-        # Calculate how often z-score crosses zero
-        zero_crossings = ((recent_zscore[:-1] * recent_zscore[1:]) < 0).sum()
-        
-        # Normalize by window size
-        reversion_rate = zero_crossings / len(recent_zscore)
-        
-        # Also check autocorrelation (negative = mean-reverting)
-        autocorr = recent_zscore.autocorr(lag=1)
-        
-        # Combine metrics
-        # High crossing rate + negative autocorr = fast reversion
-        if autocorr < 0:
-            speed_score = min(1.0, reversion_rate * 2 + abs(autocorr))
-        else:
-            speed_score = reversion_rate
-        
-        return speed_score
+        # How often the z-score crosses zero, normalized by window size, plus
+        # the lag-1 autocorrelation (negative = mean-reverting). High crossing
+        # rate + negative autocorr = fast reversion
+        values = np.ascontiguousarray(recent_zscore.to_numpy(dtype=np.float64))
+        return float(_reversion_speed(values))
     
     def calculate_thresholds(self, spread: pd.Series, zscore: pd.Series) -> Tuple[float, float]:
         """
@@ -124,14 +495,20 @@ class DynamicThresholds:
         Returns:
             Tuple of (entry_threshold, exit_threshold)
         """
+        # Debug messages are only formatted when they will be emitted
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # Convert once; both volatility windows read the same buffer
+        spread_values = np.ascontiguousarray(np.asarray(spread, dtype=np.float64))
+        
         # Calculate current volatility
-        current_vol = self.calculate_realized_volatility(spread)
+        current_vol = self.calculate_realized_volatility(spread_values)
         
         # Calculate historical volatility for comparison
-        if len(spread) > 100:
+        if len(spread_values) > 100:
             historical_vol = self.calculate_realized_volatility(
-                spread, 
-                window=min(252, len(spread))  # Up to 1 year
+                spread_values, 
+                window=min(252, len(spread_values))  # Up to 1 year
             )
         else:
             historical_vol = current_vol
@@ -142,40 +519,30 @@ class DynamicThresholds:
         else:
             vol_ratio = 1.0
         
-        logger.debug(f"Vol ratio: {vol_ratio:.2f} (current: {current_vol:.1%}, hist: {historical_vol:.1%})")
-        
-        # Adjust entry threshold based on volatility
-        if vol_ratio < 0.7:
-            # Low volatility - use tighter threshold
-            entry_multiplier = 1.0
-            logger.debug("Low volatility environment - tighter thresholds")
-        elif vol_ratio > 1.3:
-            # High volatility - use wider threshold
-            entry_multiplier = 1.5
-            logger.debug("High volatility environment - wider thresholds")
-        else:
-            # Normal volatility
-            entry_multiplier = 1.2
-            logger.debug("Normal volatility environment")
+        if debug:
+            logger.debug(f"Vol ratio: {vol_ratio:.2f} (current: {current_vol:.1%}, hist: {historical_vol:.1%})")
+        
+        # Adjust entry threshold based on volatility: tighter when low,
+        # wider when high
+        # (plain float comparisons: NumPy ufuncs cost more than they save
+        # on a scalar)
+        vol_regime = 1 - (vol_ratio < 0.7) + (vol_ratio > 1.3)
+        logger.debug(_VOL_REGIMES[vol_regime])
         
-        entry_threshold = self.base_entry * entry_multiplier
+        entry_threshold = self._entry_levels[vol_regime]
         
         # Calculate reversion speed
         reversion_speed = self.calculate_reversion_speed(spread, zscore)
         
-        logger.debug(f"Reversion speed: {reversion_speed:.2f}")
+        if debug:
+            logger.debug(f"Reversion speed: {reversion_speed:.2f}")
         
-        # Adjust exit threshold based on reversion speed
-        if reversion_speed > 0.5:
-            # Fast reversion - exit earlier to lock in profits
-            exit_multiplier = 0.8
-            logger.debug("Fast reversion - earlier exits")
-        else:
-            # Slow reversion - wait longer
-            exit_multiplier = 1.2
-            logger.debug("Slow reversion - patient exits")
+        # Adjust exit threshold based on reversion speed: exit earlier to
+        # lock in profits when fast, wait longer when slow
+        reversion_regime = int(reversion_speed > 0.5)
+        logger.debug(_REVERSION_REGIMES[reversion_regime])
         
-        exit_threshold = self.base_exit * exit_multiplier
+        exit_threshold = self._exit_levels[reversion_regime]
         
         logger.info(f"Dynamic thresholds: Entry={entry_threshold:.2f}, Exit={exit_threshold:.2f}")
         
@@ -194,35 +561,92 @@ class DynamicThresholds:
         Returns:
             DataFrame with date, entry_threshold, exit_threshold
         """
-        results = []
+        n = len(spread)
+        index = spread.index[window:].rename('date')
+        if n <= window:
+            return pd.DataFrame({'entry_threshold': [], 'exit_threshold': []}, index=index)
+        
+        # Row i is what calculate_thresholds returns for spread[i-window:i],
+        # evaluated for every i at once with rolling statistics. A window
+        # holds the returns r[i-window+1 .. i-1], so volatilities are read
+        # at i-1 and trimmed to rows window..n-1.
+        #
+        # Returns are stored as float32: the rolling std only has to place
+        # the volatility ratio against 0.7/1.3, and half-width input halves
+        # the memory traffic of both rolling passes
+        values = np.asarray(spread, dtype=np.float64)
+        returns = np.empty(n, dtype=np.float32)
+        returns[0] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(values[1:], values[:-1], out=returns[1:])
+        returns[1:] -= 1.0
+        rows = slice(window - 1, n - 1)
+        
+        current_vol = self._window_volatility(returns, window - 1, self.lookback_vol)[rows]
+        if window > 100:
+            historical_vol = self._window_volatility(returns, window - 1, min(252, window))[rows]
+        else:
+            historical_vol = current_vol
         
-        # Need at least 'window' samples to start
-        for i in range(window, len(spread)):
-            date = spread.index[i]
-            spread_window = spread.iloc[max(0, i-window):i]
-            zscore_window = zscore.iloc[max(0, i-window):i]
-            
-            entry_thresh, exit_thresh = self.calculate_thresholds(
-                spread_window,
-                zscore_window
-            )
-            
-            results.append({
-                'date': date,
-                'entry_threshold': entry_thresh,
-                'exit_threshold': exit_thresh
-            })
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol_ratio = np.where(historical_vol > 0, current_vol / historical_vol, 1.0)
+        entry_regime = _vol_regime(vol_ratio)
+        
+        # Reversion speed of the last min(lookback_reversion, window)
+        # z-scores of each window, z[i-recent:i], evaluated on array views
+        # with the same kernel calculate_reversion_speed uses
+        recent = min(self.lookback_reversion, window)
+        if recent < 10:
+            reversion_speed = np.full(n - window, 0.5)
+        else:
+            z = np.ascontiguousarray(zscore.to_numpy(dtype=np.float64))
+            reversion_speed = _rolling_reversion_speed(z[window - recent:n - 1], recent)
+        
+        exit_regime = (reversion_speed > 0.5).astype(np.int8)
+        
+        # Fill one (2, rows) buffer and hand its transpose to pandas as the
+        # frame's single block, without a consolidation copy
+        thresholds = np.empty((2, n - window))
+        np.take(self._entry_levels, entry_regime, out=thresholds[0])
+        np.take(self._exit_levels, exit_regime, out=thresholds[1])
         
-        df = pd.DataFrame(results)
-        df.set_index('date', inplace=True)
+        return pd.DataFrame(thresholds.T, index=index,
+                            columns=['entry_threshold', 'exit_threshold'], copy=False)
+    
+    @staticmethod
+    def _window_volatility(returns: np.ndarray, available: int, window: int) -> np.ndarray:
+        """
+        calculate_realized_volatility for every trailing window of returns.
         
-        return df
+        Args:
+            returns: Full return array
+            available: Returns each window holds
+            window: Volatility lookback
+            
+        Returns:
+            Array aligned with returns; entry t covers returns ending at t
+        """
+        # calculate_realized_volatility skips NaN returns and reaches further
+        # back for the last `window` real ones, so each entry is the std of a
+        # range over the NaN-free returns: the last min(window, count) of the
+        # `count` real returns its trailing `available` hold
+        real = ~np.isnan(returns)
+        compact = np.ascontiguousarray(returns[real])
+        seen = np.cumsum(real)
+        before = np.zeros_like(seen)
+        before[available:] = seen[:len(seen) - available]
+        count = seen - before
+        vol = _range_std(compact, np.maximum(before, seen - window), seen)
+        
+        # Same short-history fallback as calculate_realized_volatility
+        # (std over what is there, not annualized)
+        return np.where(count >= window, vol * np.sqrt(252),
+                        np.where(count > 0, vol, 0.01))
 
 
 if __name__ == '__main__':
     # Test dynamic thresholds
     from data_fetcher import DataFetcher
-    from statsmodels.regression.linear_model import OLS
     
     logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
     
@@ -235,19 +659,16 @@ if __name__ == '__main__':
     fetcher = DataFetcher('SLV', 'SIVR')
     data1, data2 = fetcher.fetch_data(start_date='2023-01-01')
     
-    # Calculate spread
-    X = data2['close'].values.reshape(-1, 1)
-    y = data1['close'].values
-    model = OLS(y, X).fit()
-    hedge_ratio = model.params[0]
+    # Feed the bars through the rolling pair statistics, as a live loop would
+    threshold_calc = DynamicThresholds(base_entry=2.0, base_exit=1.0, use_robust=True)
+    for price1, price2 in zip(data1.to_numpy(), data2.to_numpy()):
+        hedge_ratio, _, _, _ = threshold_calc.update(price1, price2)
     
-    spread = data1['close'] - hedge_ratio * data2['close']
-    spread_mean = spread.mean()
-    spread_std = spread.std()
-    zscore = (spread - spread_mean) / spread_std
+    # Robust (median/MAD) z-score, so vol spikes don't distort it
+    spread = data1 - hedge_ratio * data2
+    zscore = threshold_calc.calculate_zscore(spread)
     
     # Calculate dynamic thresholds
-    threshold_calc = DynamicThresholds(base_entry=2.0, base_exit=1.0)
     entry_thresh, exit_thresh = threshold_calc.calculate_thresholds(spread, zscore)
     
     print(f"\nSLV-SIVR Results:")
@@ -259,17 +680,14 @@ if __name__ == '__main__':
     fetcher2 = DataFetcher('USO', 'XLE')
     data1, data2 = fetcher2.fetch_data(start_date='2023-01-01')
     
-    X = data2['close'].values.reshape(-1, 1)
-    y = data1['close'].values
-    model = OLS(y, X).fit()
-    hedge_ratio = model.params[0]
+    threshold_calc2 = DynamicThresholds(base_entry=2.0, base_exit=1.0, use_robust=True)
+    for price1, price2 in zip(data1.to_numpy(), data2.to_numpy()):
+        hedge_ratio, _, _, _ = threshold_calc2.update(price1, price2)
     
-    spread2 = data1['close'] - hedge_ratio * data2['close']
-    spread_mean2 = spread2.mean()
-    spread_std2 = spread2.std()
-    zscore2 = (spread2 - spread_mean2) / spread_std2
+    spread2 = data1 - hedge_ratio * data2
+    zscore2 = threshold_calc2.calculate_zscore(spread2)
     
-    entry_thresh2, exit_thresh2 = threshold_calc.calculate_thresholds(spread2, zscore2)
+    entry_thresh2, exit_thresh2 = threshold_calc2.calculate_thresholds(spread2, zscore2)
     
     print(f"\nUSO-XLE Results:")
     print(f"  Entry Threshold: {entry_thresh2:.2f}")
@@ -1,17 +1,27 @@
-import PyPDF2
+import pypdfium2 as pdfium
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-# Set UTF-8 encoding for output
-sys.stdout.reconfigure(encoding='utf-8')
+from extract_pdf import extract_page
 
 pdf_path = r'c:\Users\panay\.gemini\antigravity\scratch\books\quant trading.pdf'
 
-with open(pdf_path, 'rb') as pdf_file:
-    reader = PyPDF2.PdfReader(pdf_file)
+
+if __name__ == '__main__':
+    # Set UTF-8 encoding for output
+    sys.stdout.reconfigure(encoding='utf-8', line_buffering=False)
+    
+    pdf = pdfium.PdfDocument(pdf_path)
+    n_pages = len(pdf)
+    pdf.close()
     
-    # Extract text from pages 40-100 (estimated range for Chapter 2-4)
-    for i in range(39, min(100, len(reader.pages))):
-        text = reader.pages[i].extract_text()
-        print(text)
-        print("\n" + "="*80 + "\n")
+    # Extract text from pages 40-100 (estimated range for Chapter 2-4);
+    # pages decode independently, so they are spread across processes
+    separator = "\n" + "="*80 + "\n\n"
+    with ProcessPoolExecutor() as ex:
+        for text in ex.map(partial(extract_page, path=pdf_path), range(39, min(100, n_pages))):
+            # One write per page instead of two line-buffered prints
+            sys.stdout.write(f"{text}\n{separator}")
+    sys.stdout.flush()
@@ -13,8 +13,10 @@ USAGE:
 
 import os
 import sys
-import time
+import json
+import asyncio
 import logging
+from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 from dotenv import load_dotenv
@@ -28,6 +30,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Adaptive polling: after this many unchanged cycles the interval doubles,
+# up to MAX_CHECK_INTERVAL; any change or error resets it to the base
+STABLE_CYCLES_BEFORE_BACKOFF = 3
+MAX_CHECK_INTERVAL = 1800
+
 
 class TradingBotHealthMonitor:
     """Real-time health monitoring for the trading bot"""
@@ -37,15 +44,99 @@ class TradingBotHealthMonitor:
         Initialize health monitor.
         
         Args:
-            check_interval: Seconds between health checks (default: 300 = 5 minutes)
+            check_interval: Base seconds between health checks (default: 300 = 5 minutes).
+                The interval backs off while the account is unchanged.
         """
         load_dotenv()
+        self.base_interval = check_interval
         self.check_interval = check_interval
         self.api = None
         self.last_balance = None
         self.alert_count = 0
         self.consecutive_errors = 0
         
+        # Risk limits are fixed for the process lifetime; without
+        # TRADING_CAPITAL the first observed balance becomes the baseline
+        self._risk_limit_drawdown = float(os.getenv('RISK_LIMIT_DRAWDOWN', 0.20))
+        self._initial_capital = float(os.getenv('TRADING_CAPITAL', 0)) or None
+        
+        # Last observed account snapshot and how many cycles it has held;
+        # persisted (with the drawdown baseline) so a restart keeps the
+        # balance baseline, risk limit and schedule
+        self._last_snapshot = None
+        self._stable_cycles = 0
+        self._state_path = Path(
+            os.getenv('HEALTH_MONITOR_STATE', '.cache/health_monitor_state.json')
+        ).expanduser()
+        self._load_state()
+    
+    def _load_state(self):
+        """Restore the last known account snapshot, drawdown baseline and polling interval"""
+        try:
+            with open(self._state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        self.last_balance = state.get('last_balance')
+        # An explicit TRADING_CAPITAL wins over the baseline observed earlier
+        if self._initial_capital is None:
+            self._initial_capital = state.get('initial_capital')
+        snapshot = state.get('snapshot')
+        self._last_snapshot = tuple(snapshot) if snapshot is not None else None
+        self._stable_cycles = state.get('stable_cycles', 0)
+        interval = state.get('check_interval', self.base_interval)
+        self.check_interval = min(max(interval, self.base_interval), MAX_CHECK_INTERVAL)
+        logger.info(f"Restored monitor state (next interval {self.check_interval}s)")
+    
+    def _save_state(self):
+        """Persist the account snapshot, drawdown baseline and polling interval"""
+        state = {
+            'last_balance': self.last_balance,
+            'initial_capital': self._initial_capital,
+            'snapshot': self._last_snapshot,
+            'stable_cycles': self._stable_cycles,
+            'check_interval': self.check_interval,
+            'ts': datetime.now().isoformat()
+        }
+        try:
+            self._state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._state_path, 'w') as f:
+                json.dump(state, f)
+        except OSError as e:
+            logger.warning(f"Could not save monitor state: {e}")
+    
+    def _update_schedule(self, account_status: Dict):
+        """
+        Adapt the polling interval to how much the account is changing.
+        
+        Stable cycles double the interval every STABLE_CYCLES_BEFORE_BACKOFF
+        checks (capped at MAX_CHECK_INTERVAL); a changed snapshot, a failed
+        account check or any API error drops straight back to the base.
+        
+        Args:
+            account_status: Result of the current cycle's account check
+        """
+        snapshot = (
+            account_status.get('balance'),
+            account_status.get('available'),
+            account_status.get('positions_count'),
+            self.alert_count
+        )
+        
+        if (not account_status.get('healthy') or self.consecutive_errors > 0
+                or snapshot != self._last_snapshot):
+            self._stable_cycles = 0
+            self.check_interval = self.base_interval
+        else:
+            self._stable_cycles += 1
+            if self._stable_cycles >= STABLE_CYCLES_BEFORE_BACKOFF:
+                self._stable_cycles = 0
+                self.check_interval = min(self.check_interval * 2, MAX_CHECK_INTERVAL)
+        
+        self._last_snapshot = snapshot
+        self._save_state()
+        
     def connect_api(self) -> bool:
         """Connect to Capital.com API"""
         try:
@@ -89,8 +180,19 @@ class TradingBotHealthMonitor:
             
         return status
     
-    def check_account_status(self) -> Dict:
-        """Check account balance and positions"""
+    def _account_status(self, balance: Dict = None, positions: List = None,
+                        error: Exception = None) -> Dict:
+        """
+        Build the account status from already fetched balance and positions.
+        
+        Args:
+            balance: Result of get_account_balance()
+            positions: Result of get_positions()
+            error: Exception raised while fetching either of them
+            
+        Returns:
+            Account status dictionary
+        """
         status = {
             'healthy': False,
             'balance': 0,
@@ -100,8 +202,10 @@ class TradingBotHealthMonitor:
         }
         
         try:
-            # Get account balance
-            balance = self.api.get_account_balance()
+            if error is not None:
+                raise error
+            
+            # Account balance
             status['balance'] = balance.get('balance', 0)
             status['available'] = balance.get('available', 0)
             
@@ -119,8 +223,7 @@ class TradingBotHealthMonitor:
             
             self.last_balance = status['balance']
             
-            # Get positions
-            positions = self.api.get_positions()
+            # Positions
             status['positions_count'] = len(positions)
             
             # Check for too many positions (potential issue)
@@ -150,10 +253,12 @@ class TradingBotHealthMonitor:
                 return status  # Skip if no balance data
             
             # Check drawdown
-            initial_capital = float(os.getenv('TRADING_CAPITAL', balance))
+            if self._initial_capital is None:
+                self._initial_capital = balance
+            initial_capital = self._initial_capital
             current_drawdown = (initial_capital - balance) / initial_capital
             
-            max_drawdown_limit = float(os.getenv('RISK_LIMIT_DRAWDOWN', 0.20))
+            max_drawdown_limit = self._risk_limit_drawdown
             
             if current_drawdown > max_drawdown_limit:
                 status['healthy'] = False
@@ -229,18 +334,47 @@ class TradingBotHealthMonitor:
         
         print("="*70)
     
-    def run_health_check(self):
-        """Run a single health check cycle"""
-        api_health = self.check_api_health()
+    async def run_health_check(self):
+        """
+        Run a single health check cycle.
+        
+        The ping, balance and positions requests are independent, so they
+        are issued concurrently and the cycle takes as long as the slowest
+        one rather than the sum of all three.
+        """
+        connected = True
+        if not self.api or not self.api.cst_token:
+            # Reconnect before fanning out so the account calls share the session
+            connected = await asyncio.to_thread(self.connect_api)
+        
+        if connected:
+            api_health, balance, positions = await asyncio.gather(
+                asyncio.to_thread(self.check_api_health),
+                asyncio.to_thread(self.api.get_account_balance),
+                asyncio.to_thread(self.api.get_positions),
+                return_exceptions=True
+            )
+        else:
+            # No session to fan out on; skip the calls rather than retrying the login
+            api_health = {
+                'healthy': False,
+                'message': "API not connected",
+                'timestamp': datetime.now().isoformat()
+            }
         
         if api_health['healthy']:
-            account_status = self.check_account_status()
+            if isinstance(balance, BaseException) or isinstance(positions, BaseException):
+                error = balance if isinstance(balance, BaseException) else positions
+                account_status = self._account_status(error=error)
+            else:
+                account_status = self._account_status(balance, positions)
             risk_status = self.check_risk_limits(account_status)
         else:
             account_status = {'healthy': False, 'message': 'API unavailable'}
             risk_status = {'healthy': False, 'warnings': ['Cannot check - API offline']}
         
         self.print_status_report(api_health, account_status, risk_status)
+        self._update_schedule(account_status)
         
         # Alert if too many consecutive errors
         if self.consecutive_errors >= 3:
@@ -249,26 +383,31 @@ class TradingBotHealthMonitor:
     
     def run(self):
         """Main monitoring loop"""
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            logger.info("\n\nHealth monitor stopped by user")
+            if self.api:
+                self.api.logout()
+    
+    async def _run(self):
+        """Async monitoring loop driven by run()"""
         logger.info(f"Starting health monitor (checking every {self.check_interval}s)")
         logger.info("Press Ctrl+C to stop")
         
         # Initial connection
-        if not self.connect_api():
+        if not await asyncio.to_thread(self.connect_api):
             logger.error("Failed to connect to API. Exiting.")
             return
         
         try:
             while True:
-                self.run_health_check()
+                await self.run_health_check()
                 
                 # Wait for next check
                 logger.info(f"\nNext check in {self.check_interval} seconds...")
-                time.sleep(self.check_interval)
+                await asyncio.sleep(self.check_interval)
                 
-        except KeyboardInterrupt:
-            logger.info("\n\nHealth monitor stopped by user")
-            if self.api:
-                self.api.logout()
         except Exception as e:
             logger.error(f"Health monitor error: {e}")
             if self.api:
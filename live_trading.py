@@ -8,31 +8,77 @@ USAGE:
     python live_trading.py --mode check    # Check signals only (dry run)
     python live_trading.py --mode execute  # Execute trades (REAL MONEY!)
     python live_trading.py --mode monitor  # Monitor existing positions
+    
+    # Stay resident and re-run every 5 minutes on one broker session
+    python live_trading.py --mode execute --interval-seconds 300
 
 WARNING: This trades with REAL MONEY. Only run after thorough testing.
 """
 
 import argparse
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 import pandas as pd
 
 from portfolio_manager import MultiPairPortfolio, PairConfig
 from capital_com_api import CapitalComAPI, CapitalComAPIError
 
-# Configure logging
+
+class _CachedTimeFormatter(logging.Formatter):
+    """
+    Formatter that renders the asctime prefix once per wall-clock second.
+    
+    The default formatTime runs localtime() + strftime() for every record
+    and every handler; bursts such as the execute_signal banners land in
+    the same second and only need the milliseconds swapped in.
+    """
+    
+    _cached = (None, '')  # (epoch second, formatted prefix)
+    
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, prefix = self._cached
+        if second != cached_second:
+            prefix = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cached = (second, prefix)
+        return self.default_msec_format % (prefix, record.msecs)
+
+
+# Configure logging. Records are only enqueued on the calling thread; a
+# background listener formats them and does the file/console writes, so
+# disk latency never sits between a signal and its order. force=True
+# replaces the console-only config the imported modules install.
+_log_formatter = _CachedTimeFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler('live_trading.log'), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # Drain the queue on exit
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('live_trading.log'),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(_log_queue)],
+    force=True
 )
 logger = logging.getLogger(__name__)
 
+# Seconds to wait after each unsuccessful position poll in
+# verify_positions_opened; None marks the last attempt
+POSITION_POLL_DELAYS = (0.1, 0.2, 0.4, 0.8, 1.5, None)
+
 
 class LiveTradingExecutor:
     """
@@ -58,6 +104,12 @@ class LiveTradingExecutor:
         
         self.portfolio = MultiPairPortfolio(pairs=pairs, total_capital=capital)
         
+        # Per-cycle pair_name -> (config, hedge_ratio, entry, exit), filled by
+        # check_and_execute_signals before dispatching
+        self._pair_cache = {}
+        # Per-cycle epic -> deal IDs of open positions, shared by EXIT signals
+        self._position_index = None
+        
         # Initialize broker (only if not dry run)
         self.broker = None
         if not dry_run:
@@ -103,6 +155,30 @@ class LiveTradingExecutor:
         """
         return self.portfolio.get_portfolio_status()
     
+    def _pair_parameters(self, pair_name: str) -> tuple:
+        """
+        Look up the trading parameters of a pair.
+        
+        Returns:
+            Tuple of (pair_config or None, hedge_ratio, entry_threshold, exit_threshold)
+        """
+        pair_config = next((p for p in self.portfolio.pairs if f"{p.symbol1}-{p.symbol2}" == pair_name), None)
+        hedge_ratio = self.portfolio.strategies[pair_name].hedge_ratio
+        entry_thresh, exit_thresh = self.portfolio.get_dynamic_thresholds(pair_name)
+        return pair_config, hedge_ratio, entry_thresh, exit_thresh
+    
+    def _index_positions(self) -> Dict[str, List[str]]:
+        """
+        Index open positions by instrument.
+        
+        Returns:
+            Dictionary mapping epic to the deal IDs of its open positions
+        """
+        index = {}
+        for pos in self.broker.get_positions():
+            index.setdefault(pos['market']['epic'], []).append(pos['position']['dealId'])
+        return index
+    
     def execute_signal(self, pair_name: str, signal: str, zscore: float, regime: str):
         """
         Execute a trading signal with validation and verification.
@@ -120,21 +196,27 @@ class LiveTradingExecutor:
         # Parse pair symbols
         symbol1, symbol2 = pair_name.split('-')
         
-        # Get pair configuration for position size
-        pair_config = next((p for p in self.portfolio.pairs if f"{p.symbol1}-{p.symbol2}" == pair_name), None)
+        # Pair configuration (for position size), hedge ratio and thresholds,
+        # precomputed for this cycle when called from check_and_execute_signals
+        params = self._pair_cache.get(pair_name) or self._pair_parameters(pair_name)
+        pair_config, hedge_ratio, entry_thresh, exit_thresh = params
         position_size = pair_config.max_position_size if pair_config else 0.01
         
-        # Get hedge ratio and thresholds
-        hedge_ratio = self.portfolio.strategies[pair_name].hedge_ratio
-        entry_thresh, exit_thresh = self.portfolio.get_dynamic_thresholds(pair_name)
-        
-        logger.info(f"\n{'='*70}")
-        logger.info(f"SIGNAL: {pair_name} - {signal}")
-        logger.info(f"{'='*70}")
-        logger.info(f"Z-Score: {zscore:.2f}")
-        logger.info(f"Regime: {regime}")
-        logger.info(f"Hedge Ratio: {hedge_ratio:.4f}")
-        logger.info(f"Thresholds: Entry={entry_thresh:.2f}, Exit={exit_thresh:.2f}")
+        # Everything logged before the orders go out is formatted only if
+        # INFO is enabled, and as one record per block: each record costs a
+        # handler lock and a file flush, and single records keep the blocks
+        # of concurrently executing pairs from interleaving
+        verbose = logger.isEnabledFor(logging.INFO)
+        if verbose:
+            logger.info(
+                f"\n{'='*70}\n"
+                f"SIGNAL: {pair_name} - {signal}\n"
+                f"{'='*70}\n"
+                f"Z-Score: {zscore:.2f}\n"
+                f"Regime: {regime}\n"
+                f"Hedge Ratio: {hedge_ratio:.4f}\n"
+                f"Thresholds: Entry={entry_thresh:.2f}, Exit={exit_thresh:.2f}"
+            )
         
         if self.dry_run:
             logger.info("DRY RUN - Trade NOT executed")
@@ -165,37 +247,26 @@ class LiveTradingExecutor:
                     logger.error(f"Order validation failed: {error_msg}")
                     return
                 
-                logger.info(f"\nExecuting LONG spread:")
-                logger.info(f"  Buy {symbol1} at ~${current_price1:.2f}")
-                logger.info(f"  Short {symbol2}")
-                logger.info(f"  Stop Loss: ${stop_loss:.2f}")
-                logger.info(f"  Take Profit: ${take_profit:.2f}")
+                if verbose:
+                    logger.info(
+                        f"\nExecuting LONG spread:\n"
+                        f"  Buy {symbol1} at ~${current_price1:.2f}\n"
+                        f"  Short {symbol2}\n"
+                        f"  Stop Loss: ${stop_loss:.2f}\n"
+                        f"  Take Profit: ${take_profit:.2f}"
+                    )
                 
-                # Execute trades
-                result1 = self.broker.create_position(
-                    epic=symbol1,
-                    direction='BUY',
-                    size=position_size,
-                    stop_loss=stop_loss,
-                    take_profit=take_profit
-                )
+                # Submit both legs together so the spread is not left
+                # half-open for a round trip
+                result1, result2 = self.broker.create_positions_batch([
+                    {'epic': symbol1, 'direction': 'BUY', 'size': position_size,
+                     'stop_loss': stop_loss, 'take_profit': take_profit},
+                    {'epic': symbol2, 'direction': 'SELL', 'size': position_size},
+                ])
                 
-                # Verify first position was created
                 deal_ref1 = result1.get('dealReference')
-                logger.info(f"✓ Position 1 created: {deal_ref1}")
-                
-                # Wait briefly for position to register
-                import time
-                time.sleep(1)
-                
-                # Short symbol2 with inverse SL/TP logic
-                result2 = self.broker.create_position(
-                    epic=symbol2,
-                    direction='SELL',
-                    size=position_size
-                )
-                
                 deal_ref2 = result2.get('dealReference')
+                logger.info(f"✓ Position 1 created: {deal_ref1}")
                 logger.info(f"✓ Position 2 created: {deal_ref2}")
                 
                 # Verify both positions are open
@@ -214,31 +285,22 @@ class LiveTradingExecutor:
                     logger.error(f"Order validation failed: {error_msg}")
                     return
                 
-                logger.info(f"\nExecuting SHORT spread:")
-                logger.info(f"  Short {symbol1} at ~${current_price1:.2f}")
-                logger.info(f"  Buy {symbol2}")
+                if verbose:
+                    logger.info(
+                        f"\nExecuting SHORT spread:\n"
+                        f"  Short {symbol1} at ~${current_price1:.2f}\n"
+                        f"  Buy {symbol2}"
+                    )
                 
-                result1 = self.broker.create_position(
-                    epic=symbol1,
-                    direction='SELL',
-                    size=position_size,
-                    stop_loss=stop_loss,
-                    take_profit=take_profit
-                )
+                result1, result2 = self.broker.create_positions_batch([
+                    {'epic': symbol1, 'direction': 'SELL', 'size': position_size,
+                     'stop_loss': stop_loss, 'take_profit': take_profit},
+                    {'epic': symbol2, 'direction': 'BUY', 'size': position_size},
+                ])
                 
                 deal_ref1 = result1.get('dealReference')
-                logger.info(f"✓ Position 1 created: {deal_ref1}")
-                
-                import time
-                time.sleep(1)
-                
-                result2 = self.broker.create_position(
-                    epic=symbol2,
-                    direction='BUY',
-                    size=position_size
-                )
-                
                 deal_ref2 = result2.get('dealReference')
+                logger.info(f"✓ Position 1 created: {deal_ref1}")
                 logger.info(f"✓ Position 2 created: {deal_ref2}")
                 
                 # Verify both positions are open
@@ -247,27 +309,25 @@ class LiveTradingExecutor:
             elif signal == 'EXIT':
                 logger.info(f"\nClosing {pair_name} positions...")
                 
-                # Get all open positions
-                positions = self.broker.get_positions()
-                closed_count = 0
+                # Open positions by instrument, fetched once per cycle
+                position_index = self._position_index
+                if position_index is None:
+                    position_index = self._index_positions()
+                deal_ids = []
+                for epic in (symbol1, symbol2):
+                    for deal_id in position_index.get(epic, ()):
+                        logger.info(f"  Closing {epic} position {deal_id}")
+                        deal_ids.append(deal_id)
                 
-                for pos in positions:
-                    pos_data = pos['position']
-                    pos_epic = pos['market']['epic']
-                    
-                    if pos_epic in [symbol1, symbol2]:
-                        deal_id = pos_data['dealId']
-                        logger.info(f"  Closing {pos_epic} position {deal_id}")
-                        self.broker.close_position(deal_id)
-                        closed_count += 1
+                # All legs close together rather than one round trip each
+                self.broker.close_positions_batch(deal_ids)
                 
-                logger.info(f"✓ Closed {closed_count} position(s)")
+                logger.info(f"✓ Closed {len(deal_ids)} position(s)")
                 
         except CapitalComAPIError as e:
             logger.error(f"Failed to execute trade: {e}")
         except Exception as e:
             logger.error(f"Unexpected error executing trade: {e}")
-            import traceback
             logger.error(traceback.format_exc())
     
     def verify_positions_opened(self, deal_references: list):
@@ -278,16 +338,16 @@ class LiveTradingExecutor:
             deal_references: List of deal reference IDs to verify
         """
         try:
-            import time
-            time.sleep(2)  # Wait for positions to register
-            
-            positions = self.broker.get_positions()
-            opened_deals = set()
-            
-            for pos in positions:
-                pos_ref = pos['position'].get('dealReference', '')
-                if pos_ref:
-                    opened_deals.add(pos_ref)
+            # Poll until every position has registered, backing off between
+            # attempts (about 3s in total) instead of a fixed wait; fills
+            # usually show up on the first or second poll
+            wanted = set(deal_references)
+            for delay in POSITION_POLL_DELAYS:
+                positions = self.broker.get_positions()
+                opened_deals = {pos['position'].get('dealReference', '') for pos in positions}
+                if wanted <= opened_deals or delay is None:
+                    break
+                time.sleep(delay)
             
             verified = 0
             for deal_ref in deal_references:
@@ -318,15 +378,40 @@ class LiveTradingExecutor:
         
         logger.info(f"\n{signals_df.to_string(index=False)}\n")
         
-        # Execute each signal
-        for _, row in signals_df.iterrows():
-            if row['signal'] in ['LONG', 'SHORT', 'EXIT']:
-                self.execute_signal(
-                    pair_name=row['pair'],
-                    signal=row['signal'],
-                    zscore=row['zscore'],
-                    regime=row['regime']
-                )
+        # Execute each signal. Pairs trade different instruments, so their
+        # orders are independent and run concurrently: N pairs take about
+        # as long as the slowest one instead of the sum
+        mask = signals_df['signal'].isin(['LONG', 'SHORT', 'EXIT'])
+        actionable = list(signals_df.loc[mask, ['pair', 'signal', 'zscore', 'regime']]
+                          .itertuples(index=False))
+        if not actionable:
+            return
+        
+        # Resolve every pair's parameters up front so the workers go
+        # straight from signal to order
+        self._pair_cache = {row.pair: self._pair_parameters(row.pair) for row in actionable}
+        if not self.dry_run and any(row.signal == 'EXIT' for row in actionable):
+            self._position_index = self._index_positions()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(actionable)) as executor:
+                futures = [
+                    executor.submit(
+                        self.execute_signal,
+                        pair_name=row.pair,
+                        signal=row.signal,
+                        zscore=row.zscore,
+                        regime=row.regime
+                    )
+                    for row in actionable
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            # Thresholds and positions move with every bar; never reuse
+            # them next cycle
+            self._pair_cache = {}
+            self._position_index = None
     
     def monitor_positions(self):
         """Monitor existing positions"""
@@ -359,12 +444,19 @@ class LiveTradingExecutor:
         except Exception as e:
             logger.error(f"Failed to retrieve positions: {e}")
     
-    def run(self, mode: str = 'check'):
+    def run(self, mode: str = 'check', interval_seconds: int = None,
+            keep_session: bool = False):
         """
         Main execution method.
         
         Args:
             mode: 'check', 'execute', or 'monitor'
+            interval_seconds: If set, stay resident and repeat the cycle at
+                this interval on one authenticated session instead of
+                running once
+            keep_session: Leave the broker session open on exit; its cached
+                tokens let the next invocation (e.g. the next cron tick)
+                skip the login
         """
         logger.info(f"\n{'='*70}")
         logger.info(f"LIVE TRADING BOT - MODE: {mode.upper()}")
@@ -377,6 +469,37 @@ class LiveTradingExecutor:
             logger.error("Failed to connect to broker - ABORTING")
             return
         
+        try:
+            while self.run_cycle(mode) and interval_seconds:
+                logger.info(f"Next cycle in {interval_seconds} seconds...")
+                time.sleep(interval_seconds)
+        except KeyboardInterrupt:
+            logger.info("Stopped by user")
+        finally:
+            # Cleanup
+            if self.broker and not self.dry_run:
+                if keep_session:
+                    logger.info("\nKeeping broker session for the next run")
+                    self.broker.close()
+                else:
+                    logger.info("\nLogging out...")
+                    self.broker.logout()
+        
+        logger.info(f"\n{'='*70}")
+        logger.info("SESSION COMPLETE")
+        logger.info(f"{'='*70}\n")
+    
+    def run_cycle(self, mode: str) -> bool:
+        """
+        Refresh the portfolio and act on it once.
+        
+        Args:
+            mode: 'check', 'execute', or 'monitor'
+            
+        Returns:
+            False if trading must stop (drawdown breached or a mode/dry-run
+            conflict), True otherwise
+        """
         self.initialize_portfolio()
         
         # Check portfolio risk
@@ -388,7 +511,7 @@ class LiveTradingExecutor:
         
         if risk['max_drawdown_breached']:
             logger.error("MAX DRAWDOWN BREACHED - EMERGENCY STOP")
-            return
+            return False
         
         # Execute based on mode
         if mode == 'check':
@@ -399,7 +522,7 @@ class LiveTradingExecutor:
         elif mode == 'execute':
             if self.dry_run:
                 logger.warning("Cannot execute in dry_run mode!")
-                return
+                return False
             logger.info("EXECUTE MODE - Will place real trades!\n")
             self.check_and_execute_signals()
             
@@ -407,14 +530,7 @@ class LiveTradingExecutor:
             logger.info("MONITOR MODE - Checking positions\n")
             self.monitor_positions()
         
-        # Cleanup
-        if self.broker and not self.dry_run:
-            logger.info("\nLogging out...")
-            self.broker.logout()
-        
-        logger.info(f"\n{'='*70}")
-        logger.info("SESSION COMPLETE")
-        logger.info(f"{'='*70}\n")
+        return True
 
 
 def main():
@@ -426,6 +542,10 @@ def main():
                        help='Dry run mode (no real trades)')
     parser.add_argument('--capital', type=float, default=111.55,
                        help='Total trading capital')
+    parser.add_argument('--interval-seconds', type=int, default=None,
+                       help='Stay running and repeat every N seconds on one broker session')
+    parser.add_argument('--keep-session', action='store_true',
+                       help="Don't log out on exit, so the next run reuses the cached session")
     
     args = parser.parse_args()
     
@@ -449,7 +569,8 @@ def main():
         dry_run=args.dry_run or args.mode != 'execute'
     )
     
-    executor.run(mode=args.mode)
+    executor.run(mode=args.mode, interval_seconds=args.interval_seconds,
+                 keep_session=args.keep_session)
 
 
 if __name__ == '__main__':
@@ -8,8 +8,8 @@ strategy execution, backtesting, and performance reporting.
 
 import argparse
 import logging
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 import sys
 
@@ -20,7 +20,8 @@ from cointegration_test import CointegrationAnalyzer
 from pairs_trading_strategy import PairsTradingStrategy
 from backtest_engine import BacktestEngine
 from risk_manager import RiskManager
-from utils import print_performance_summary
+from utils import (print_performance_summary, get_pyplot, inputs_digest, cached_result,
+                   RESULT_CACHE_DIR)
 
 # Set up logging
 logging.basicConfig(
@@ -46,7 +47,7 @@ class QuantTradingBot:
     """
     
     def __init__(self, symbol1: str = SYMBOL_1, symbol2: str = SYMBOL_2,
-                 initial_capital: float = INITIAL_CAPITAL):
+                 initial_capital: float = INITIAL_CAPITAL, use_cache: bool = True):
         """
         Initialize the trading bot.
         
@@ -54,12 +55,18 @@ class QuantTradingBot:
             symbol1: First trading symbol
             symbol2: Second trading symbol
             initial_capital: Starting capital
+            use_cache: Reuse cointegration and backtest results computed
+                earlier on identical prices and parameters
         """
         self.symbol1 = symbol1
         self.symbol2 = symbol2
         self.initial_capital = initial_capital
+        self.use_cache = use_cache
         
         # Initialize components
+        # Prices stay float64: the backtest kernels compute in float64, and
+        # float32 input would be upcast to a fresh buffer on every call,
+        # defeating BacktestEngine's spread-return cache
         self.data_fetcher = DataFetcher(symbol1, symbol2)
         self.strategy = PairsTradingStrategy(
             entry_threshold=ENTRY_THRESHOLD,
@@ -79,8 +86,47 @@ class QuantTradingBot:
         logger.info(f"Initialized QuantTradingBot for {symbol1}-{symbol2}")
         logger.info(f"Initial capital: ${initial_capital:,.2f}")
     
+    def _cached(self, name: str, compute, *inputs):
+        """Run compute(), or load its result if these inputs were seen before"""
+        if not self.use_cache:
+            return compute()
+        result, hit = cached_result(name, inputs_digest(*inputs), compute)
+        if hit:
+            logger.info(f"Using cached {name} result from {RESULT_CACHE_DIR} "
+                        f"(pass --no-cache to recompute)")
+        return result
+    
+    def _backtest(self, prices1: pd.Series, prices2: pd.Series,
+                  train1: pd.Series, train2: pd.Series) -> tuple:
+        """
+        Run the strategy calibrated on train1/train2 and backtest it.
+        
+        Returns:
+            Tuple of (strategy_results, backtest_results)
+        """
+        def compute():
+            strategy_results = self.strategy.run_strategy(
+                prices1=prices1,
+                prices2=prices2,
+                train_prices1=train1,
+                train_prices2=train2
+            )
+            backtest_results = self.backtest_engine.run_backtest(
+                prices1=prices1,
+                prices2=prices2,
+                positions=strategy_results['positions'],
+                hedge_ratio=strategy_results['hedge_ratio'],
+                initial_capital=self.initial_capital
+            )
+            return strategy_results, backtest_results
+        
+        params = (ENTRY_THRESHOLD, EXIT_THRESHOLD, TRANSACTION_COST_BPS,
+                  SLIPPAGE_BPS, self.initial_capital)
+        return self._cached('backtest', compute, prices1, prices2, train1, train2, params)
+    
     def run_analysis(self, start_date: str = START_DATE, 
-                    end_date: str = None) -> dict:
+                    end_date: str = None, plots: bool = True,
+                    force: bool = False) -> dict:
         """
         Run complete analysis workflow.
         
@@ -94,9 +140,13 @@ class QuantTradingBot:
         Args:
             start_date: Start date for historical data
             end_date: End date (None for current)
+            plots: Render and save the analysis figures
+            force: Backtest the pair even if it fails the cointegration or
+                half-life checks
         
         Returns:
-            Dictionary with all analysis results
+            Dictionary with all analysis results (only 'cointegration' when
+            the pair is rejected)
         """
         logger.info("="*80)
         logger.info("STARTING QUANTITATIVE TRADING ANALYSIS")
@@ -127,62 +177,52 @@ class QuantTradingBot:
         logger.info("STEP 3: COINTEGRATION ANALYSIS (TRAINING SET)")
         logger.info("="*60)
         coint_analyzer = CointegrationAnalyzer(
-            train1['close'], train2['close'],
+            train1, train2,
             self.symbol1, self.symbol2
         )
-        coint_results = coint_analyzer.full_analysis()
+        coint_results = self._cached('cointegration', coint_analyzer.full_analysis,
+                                     train1, train2)
+        coint_analyzer.hedge_ratio = coint_results['hedge_ratio']
         
         # Visualize cointegration
-        coint_fig = coint_analyzer.plot_analysis()
-        coint_fig.savefig('cointegration_analysis.png', dpi=150, bbox_inches='tight')
-        logger.info("Saved cointegration analysis plot: cointegration_analysis.png")
+        if plots:
+            coint_fig = coint_analyzer.plot_analysis()
+            coint_fig.savefig('cointegration_analysis.png', dpi=150, bbox_inches='tight')
+            logger.info("Saved cointegration analysis plot: cointegration_analysis.png")
         
         # Check if pair is suitable
+        suitable = True
         if not coint_results['is_cointegrated']:
             logger.warning("⚠ WARNING: Pair is not cointegrated!")
             logger.warning("  Trading this pair may not be profitable.")
+            suitable = False
         
         if coint_results['half_life'] > MAX_HALF_LIFE:
             logger.warning(f"⚠ WARNING: Half-life ({coint_results['half_life']:.1f} days) "
                          f"exceeds maximum ({MAX_HALF_LIFE} days)")
             logger.warning("  Mean reversion may be too slow for this strategy.")
+            suitable = False
+        
+        if not suitable and not force:
+            logger.warning("Skipping backtests for this pair (use --force to run them anyway)")
+            return {'cointegration': coint_results}
         
         # Step 4: Backtest on training data
         logger.info("\n" + "="*60)
         logger.info("STEP 4: BACKTESTING ON TRAINING DATA")
         logger.info("="*60)
-        train_strategy_results = self.strategy.run_strategy(
-            prices1=train1['close'],
-            prices2=train2['close'],
-            train_prices1=train1['close'],  # Use same data for calibration
-            train_prices2=train2['close']
-        )
-        
-        train_backtest_results = self.backtest_engine.run_backtest(
-            prices1=train1['close'],
-            prices2=train2['close'],
-            positions=train_strategy_results['positions'],
-            hedge_ratio=train_strategy_results['hedge_ratio'],
-            initial_capital=self.initial_capital
+        train_strategy_results, train_backtest_results = self._backtest(
+            train1, train2,
+            train1, train2  # Use same data for calibration
         )
         
         # Step 5: Backtest on testing data (out-of-sample)
         logger.info("\n" + "="*60)
         logger.info("STEP 5: BACKTESTING ON TESTING DATA (OUT-OF-SAMPLE)")
         logger.info("="*60)
-        test_strategy_results = self.strategy.run_strategy(
-            prices1=test1['close'],
-            prices2=test2['close'],
-            train_prices1=train1['close'],  # Use training data for calibration
-            train_prices2=train2['close']
-        )
-        
-        test_backtest_results = self.backtest_engine.run_backtest(
-            prices1=test1['close'],
-            prices2=test2['close'],
-            positions=test_strategy_results['positions'],
-            hedge_ratio=test_strategy_results['hedge_ratio'],
-            initial_capital=self.initial_capital
+        test_strategy_results, test_backtest_results = self._backtest(
+            test1, test2,
+            train1, train2  # Use training data for calibration
         )
         
         # Step 6: Compare train vs test performance
@@ -195,25 +235,26 @@ class QuantTradingBot:
         )
         
         # Step 7: Visualize results
-        logger.info("\n" + "="*60)
-        logger.info("STEP 7: GENERATING VISUALIZATIONS")
-        logger.info("="*60)
-        
-        # Training results plot
-        train_fig = self.backtest_engine.plot_results(
-            train_backtest_results,
-            title=f"{self.symbol1}-{self.symbol2} Pairs Trading - TRAINING SET"
-        )
-        train_fig.savefig('backtest_training.png', dpi=150, bbox_inches='tight')
-        logger.info("Saved training backtest plot: backtest_training.png")
-        
-        # Testing results plot
-        test_fig = self.backtest_engine.plot_results(
-            test_backtest_results,
-            title=f"{self.symbol1}-{self.symbol2} Pairs Trading - TESTING SET"
-        )
-        test_fig.savefig('backtest_testing.png', dpi=150, bbox_inches='tight')
-        logger.info("Saved testing backtest plot: backtest_testing.png")
+        if plots:
+            logger.info("\n" + "="*60)
+            logger.info("STEP 7: GENERATING VISUALIZATIONS")
+            logger.info("="*60)
+            
+            # Training results plot
+            train_fig = self.backtest_engine.plot_results(
+                train_backtest_results,
+                title=f"{self.symbol1}-{self.symbol2} Pairs Trading - TRAINING SET"
+            )
+            train_fig.savefig('backtest_training.png', dpi=150, bbox_inches='tight')
+            logger.info("Saved training backtest plot: backtest_training.png")
+            
+            # Testing results plot
+            test_fig = self.backtest_engine.plot_results(
+                test_backtest_results,
+                title=f"{self.symbol1}-{self.symbol2} Pairs Trading - TESTING SET"
+            )
+            test_fig.savefig('backtest_testing.png', dpi=150, bbox_inches='tight')
+            logger.info("Saved testing backtest plot: backtest_testing.png")
         
         # Step 8: Final assessment
         logger.info("\n" + "="*80)
@@ -248,13 +289,14 @@ class QuantTradingBot:
         }
     
     def run_full_period_backtest(self, start_date: str = START_DATE,
-                                end_date: str = None) -> dict:
+                                end_date: str = None, plots: bool = True) -> dict:
         """
         Run backtest on the entire historical period (for final validation).
         
         Args:
             start_date: Start date
             end_date: End date (None for current)
+            plots: Render and save the equity curve figure
         
         Returns:
             Backtest results dictionary
@@ -270,30 +312,17 @@ class QuantTradingBot:
         train1 = data1.iloc[:LOOKBACK_PERIOD]
         train2 = data2.iloc[:LOOKBACK_PERIOD]
         
-        # Run strategy on full period
-        strategy_results = self.strategy.run_strategy(
-            prices1=data1['close'],
-            prices2=data2['close'],
-            train_prices1=train1['close'],
-            train_prices2=train2['close']
-        )
-        
-        # Backtest
-        backtest_results = self.backtest_engine.run_backtest(
-            prices1=data1['close'],
-            prices2=data2['close'],
-            positions=strategy_results['positions'],
-            hedge_ratio=strategy_results['hedge_ratio'],
-            initial_capital=self.initial_capital
-        )
+        # Run strategy on full period and backtest it
+        strategy_results, backtest_results = self._backtest(data1, data2, train1, train2)
         
         # Plot
-        fig = self.backtest_engine.plot_results(
-            backtest_results,
-            title=f"{self.symbol1}-{self.symbol2} Pairs Trading - FULL PERIOD"
-        )
-        fig.savefig('backtest_full_period.png', dpi=150, bbox_inches='tight')
-        logger.info("Saved full period backtest plot: backtest_full_period.png")
+        if plots:
+            fig = self.backtest_engine.plot_results(
+                backtest_results,
+                title=f"{self.symbol1}-{self.symbol2} Pairs Trading - FULL PERIOD"
+            )
+            fig.savefig('backtest_full_period.png', dpi=150, bbox_inches='tight')
+            logger.info("Saved full period backtest plot: backtest_full_period.png")
         
         return backtest_results
 
@@ -316,34 +345,59 @@ def main():
                        help='End date YYYY-MM-DD (default: current date)')
     parser.add_argument('--capital', type=float, default=INITIAL_CAPITAL,
                        help=f'Initial capital (default: ${INITIAL_CAPITAL:,.0f})')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Recompute cointegration and backtests instead of reusing cached results')
+    parser.add_argument('--plots', action=argparse.BooleanOptionalAction, default=None,
+                       help='Save analysis figures (default: on, except in backtest mode)')
+    parser.add_argument('--force', action='store_true',
+                       help='Backtest the pair even if it is not cointegrated or mean-reverts too slowly')
     
     args = parser.parse_args()
     
+    # Metrics-only backtest runs (grid searches, walk-forward drivers) skip
+    # figure rendering unless explicitly asked for
+    plots = args.plots if args.plots is not None else args.mode != 'backtest'
+    
+    # Unattended runs (cron, systemd, output redirected) render plots with
+    # the non-interactive Agg backend and must not block on plt.show();
+    # matplotlib itself is only imported once something is plotted
+    interactive = sys.stdout.isatty() and not os.environ.get('HEADLESS')
+    if not interactive:
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+    
     # Create bot
     bot = QuantTradingBot(
         symbol1=args.symbol1,
         symbol2=args.symbol2,
-        initial_capital=args.capital
+        initial_capital=args.capital,
+        use_cache=not args.no_cache
     )
     
     # Run based on mode
     if args.mode in ['analysis', 'backtest']:
-        results = bot.run_analysis(start_date=args.start, end_date=args.end)
+        results = bot.run_analysis(start_date=args.start, end_date=args.end, plots=plots,
+                                   force=args.force)
     elif args.mode == 'full':
-        results = bot.run_full_period_backtest(start_date=args.start, end_date=args.end)
+        results = bot.run_full_period_backtest(start_date=args.start, end_date=args.end,
+                                               plots=plots)
     
     logger.info("\n" + "="*80)
     logger.info("ANALYSIS COMPLETE!")
     logger.info("="*80)
     logger.info("Generated files:")
-    logger.info("  - cointegration_analysis.png")
-    logger.info("  - backtest_training.png")
-    logger.info("  - backtest_testing.png")
+    if plots and args.mode == 'full':
+        logger.info("  - backtest_full_period.png")
+    elif plots:
+        logger.info("  - cointegration_analysis.png")
+        if 'test_backtest' in results:
+            logger.info("  - backtest_training.png")
+            logger.info("  - backtest_testing.png")
     logger.info(f"  - {LOG_FILE} (log file)")
     logger.info("="*80)
     
     # Keep plots open
-    plt.show()
+    if interactive and plots:
+        get_pyplot().show()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+"""
+Optional Numba Acceleration
+
+Exposes `njit` and `prange` for the numerical kernels. When Numba is not
+installed the decorators become no-ops and the kernels run as plain Python,
+so the bot keeps working (only slower) without the dependency.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (supports bare and called forms)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+    logger.debug("Numba not installed - numerical kernels run in pure Python")
+
+# fastmath flags that keep NaN/inf semantics intact, so kernels that scrub
+# non-finite values with np.isfinite are not optimized into wrong results
+SAFE_FASTMATH = {'nsz', 'arcp', 'contract'}
@@ -83,7 +83,7 @@ class PairScanner:
                 start_date=self.start_date,
                 end_date=self.end_date
             )
-            return data1['close'], data2['close']
+            return data1, data2
         except Exception as e:
             logger.error(f"Error fetching {symbol1}-{symbol2}: {e}")
             return None, None
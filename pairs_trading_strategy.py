@@ -9,10 +9,35 @@ import numpy as np
 import pandas as pd
 from typing import Tuple, Optional
 import logging
+from numba_compat import njit
 
 logger = logging.getLogger(__name__)
 
 
+@njit(cache=True)
+def _positions_kernel(long_entry, short_entry, exit_signal):
+    """
+    Position state machine over boolean signal arrays.
+    
+    Exit takes precedence over entry while a position is open; otherwise
+    the position is held until the next signal.
+    """
+    n = len(long_entry)
+    positions = np.zeros(n)
+    current_position = 0.0
+    
+    for i in range(n):
+        if exit_signal[i] and current_position != 0.0:
+            current_position = 0.0
+        elif long_entry[i]:
+            current_position = 1.0  # Long the spread
+        elif short_entry[i]:
+            current_position = -1.0  # Short the spread
+        positions[i] = current_position
+    
+    return positions
+
+
 class PairsTradingStrategy:
     """
     Implements pairs trading strategy based on mean-reverting spreads.
@@ -150,23 +175,13 @@ class PairsTradingStrategy:
         Returns:
             Position series
         """
-        positions = pd.Series(0, index=long_entry.index, dtype=float)
-        current_position = 0
-        
-        for i in range(len(positions)):
-            # Check for exit first
-            if exit_signal.iloc[i] and current_position != 0:
-                current_position = 0
-            
-            # Check for entry signals
-            elif long_entry.iloc[i]:
-                current_position = 1  # Long the spread
-            elif short_entry.iloc[i]:
-                current_position = -1  # Short the spread
-            
-            positions.iloc[i] = current_position
+        # Each bar depends on the previous position, so this is a sequential
+        # scan; it runs compiled over plain arrays rather than per-row .iloc
+        positions = _positions_kernel(long_entry.to_numpy(dtype=bool),
+                                      short_entry.to_numpy(dtype=bool),
+                                      exit_signal.to_numpy(dtype=bool))
         
-        return positions
+        return pd.Series(positions, index=long_entry.index)
     
     def run_strategy(self, prices1: pd.Series, prices2: pd.Series,
                     train_prices1: Optional[pd.Series] = None,
@@ -209,9 +224,12 @@ class PairsTradingStrategy:
         # Calculate positions
         positions = self.calculate_positions(long_entry, short_entry, exit_signal)
         
-        # Count trades
-        position_changes = positions.diff().fillna(0)
-        num_entries = (position_changes != 0).sum()
+        # Count trades (compare against the previous bar; first bar never counts)
+        pos = positions.values
+        changed = np.empty(len(pos), dtype=bool)
+        changed[:1] = False
+        np.not_equal(pos[1:], pos[:-1], out=changed[1:])
+        num_entries = int(np.count_nonzero(changed))
         
         logger.info(f"Generated {num_entries} position changes")
         logger.info(f"Long entries: {long_entry.sum()}")
@@ -251,10 +269,10 @@ if __name__ == "__main__":
     
     # Run strategy
     results = strategy.run_strategy(
-        prices1=test1['close'],
-        prices2=test2['close'],
-        train_prices1=train1['close'],
-        train_prices2=train2['close']
+        prices1=test1,
+        prices2=test2,
+        train_prices1=train1,
+        train_prices2=train2
     )
     
     print("\n" + "="*60)
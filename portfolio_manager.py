@@ -93,7 +93,7 @@ class MultiPairPortfolio:
         )
         
         # Calculate spread
-        spread = strategy.calculate_spread(data1['close'], data2['close'])
+        spread = strategy.calculate_spread(data1, data2)
         zscore = strategy.calculate_zscore(spread)
         spread_returns = spread.pct_change().dropna()
         
@@ -266,12 +266,12 @@ if __name__ == '__main__':
     # Calculate spread
     print("2. Calculating spread...")
     from statsmodels.regression.linear_model import OLS
-    X = data2['close'].values.reshape(-1, 1)
-    y = data1['close'].values
+    X = data2.values.reshape(-1, 1)
+    y = data1.values
     model = OLS(y, X).fit()
     hedge_ratio = model.params[0]
     
-    spread = data1['close'] - hedge_ratio * data2['close']
+    spread = data1 - hedge_ratio * data2
     spread_returns = spread.pct_change().dropna()
     
     print(f"   Hedge ratio: {hedge_ratio:.4f}")
@@ -3,11 +3,13 @@ Utility functions for the Quantitative Trading Bot
 Based on Ernest Chan's "Quantitative Trading" methodology
 """
 
+import os
+import hashlib
+import pickle
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Tuple, Optional
+from pathlib import Path
+from typing import Any, Callable, Tuple, Optional
 import logging
 from datetime import datetime
 
@@ -19,6 +21,105 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def get_pyplot():
+    """
+    Import matplotlib.pyplot on first use.
+    
+    Keeps matplotlib out of code paths that never plot (backtest sweeps,
+    worker processes). Selects the non-interactive Agg backend when the
+    HEADLESS environment variable is set.
+    
+    Returns:
+        The matplotlib.pyplot module
+    """
+    import matplotlib
+    if os.environ.get('HEADLESS'):
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# On-disk cache of analysis results (cointegration, strategy/backtest runs),
+# next to the price cache in .cache/prices
+RESULT_CACHE_DIR = Path('.cache/results')
+
+# Salted into every result key and file name. Bump it whenever a change to
+# CointegrationAnalyzer, PairsTradingStrategy or BacktestEngine alters what
+# a cached result would contain; files from older versions are pruned
+RESULT_CACHE_VERSION = 1
+
+
+def inputs_digest(*parts) -> str:
+    """
+    Content hash of an analysis step's inputs.
+    
+    pandas objects are hashed by values and index, so the key changes as
+    soon as the data does (e.g. a new bar for an open-ended date range);
+    anything else by its repr. RESULT_CACHE_VERSION is always included.
+    
+    Args:
+        *parts: Series/DataFrames and parameters the step depends on
+    
+    Returns:
+        Hex sha256 digest
+    """
+    digest = hashlib.sha256(f"v{RESULT_CACHE_VERSION}\0".encode())
+    for part in parts:
+        if isinstance(part, (pd.Series, pd.DataFrame)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _prune_result_cache(name: str, cache_dir: Path):
+    """Delete `name` results written under other RESULT_CACHE_VERSIONs"""
+    current = f"{name}-v{RESULT_CACHE_VERSION}-"
+    for path in Path(cache_dir).glob(f"{name}-*.pkl"):
+        if not path.name.startswith(current):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def cached_result(name: str, digest: str, compute: Callable[[], Any],
+                  cache_dir: Path = RESULT_CACHE_DIR) -> Tuple[Any, bool]:
+    """
+    Return a pickled result for these inputs, computing and storing it on a miss.
+    
+    Args:
+        name: Step name, used in the file name
+        digest: inputs_digest() of everything the step depends on
+        compute: Zero-argument callable producing the result
+        cache_dir: Cache directory
+    
+    Returns:
+        Tuple of (result, loaded_from_cache)
+    """
+    path = Path(cache_dir) / f"{name}-v{RESULT_CACHE_VERSION}-{digest[:32]}.pkl"
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f), True
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    
+    result = compute()
+    
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        _prune_result_cache(name, cache_dir)
+    except OSError as e:
+        logger.warning(f"Could not cache {name} result: {e}")
+    
+    return result, False
+
+
 def calculate_sharpe_ratio(returns: pd.Series, periods_per_year: int = 252) -> float:
     """
     Calculate annualized Sharpe ratio.
@@ -183,6 +284,8 @@ def plot_equity_curve(cumulative_returns: pd.Series, title: str = "Equity Curve"
         cumulative_returns: Series of cumulative returns
         title: Plot title
     """
+    plt = get_pyplot()
+    
     plt.figure(figsize=(14, 6))
     
     # Convert to percentage
@@ -206,6 +309,8 @@ def plot_drawdown(cumulative_returns: pd.Series, title: str = "Drawdown Over Tim
         cumulative_returns: Series of cumulative returns
         title: Plot title
     """
+    plt = get_pyplot()
+    
     plt.figure(figsize=(14, 6))
     
     # Calculate drawdown
@@ -240,6 +345,8 @@ def plot_spread_and_zscore(spread: pd.Series, zscore: pd.Series,
         entry_threshold: Entry threshold (standard deviations)
         exit_threshold: Exit threshold (standard deviations)
     """
+    plt = get_pyplot()
+    
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
     
     # Plot spread